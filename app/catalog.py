@@ -0,0 +1,43 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.db import data_version
+from app.models import Matter
+
+
+class MatterCatalog:
+    """
+    Process-wide copy of the matter table, which is small and rarely changes.
+    It's reloaded whenever the database changed since the last load.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        # Changes only when the matters do, unlike the version.
+        self.digest = ""
+        # When this process first saw the current matters.
+        self.changed_at = datetime.fromtimestamp(0, timezone.utc)
+        self.matters: List[Dict[str, Any]] = []
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_abbr: Dict[str, Dict[str, Any]] = {}
+
+    async def load(self):
+        version = data_version()
+        matters = await Matter.select().order_by(Matter.name)
+        self.matters = matters
+        self.by_id = {matter["id"]: matter for matter in matters}
+        self.by_abbr = {matter["abbr"]: matter for matter in matters}
+        digest = hashlib.sha256(repr(matters).encode()).hexdigest()
+        if digest != self.digest:
+            self.digest = digest
+            self.changed_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self.version = version
+
+    async def get(self) -> "MatterCatalog":
+        if self.version is None or self.version != data_version():
+            await self.load()
+        return self
+
+
+catalog = MatterCatalog()
@@ -1,21 +1,111 @@
+import csv
+import json
 import sys
+import time
+from datetime import date
+
+from piccolo.utils.sync import run_sync
 
 from app.data import DEFAULT_MATTERS
-from app.models import Matter, User
+from app.models import Matter, PromotionVersion, Task, User, UserVersion
+from app.validation import validate_task
+
+IMPORT_BATCH_SIZE = 1000
 
 
 def init():
+    # Running servers reload their matters once they see the database changed.
     Matter.insert(*DEFAULT_MATTERS).run_sync()
     print("Done!")
 
 
+async def set_admin(emails, admin):
+    users = (
+        await User.update({User.admin: admin})
+        .where(User.email.is_in(emails))
+        .returning(User.id)
+    )
+    # Running servers forget the cached identities of these users.
+    await UserVersion.bump(*[user["id"] for user in users])
+
+
 def grant():
     emails = sys.argv[1:]
-    User.update({User.admin: True}).where(User.email.is_in(emails)).run_sync()
+    run_sync(set_admin(emails, True))
     print("Done: " + ", ".join(emails))
 
 
 def ungrant():
     emails = sys.argv[1:]
-    User.update({User.admin: False}).where(User.email.is_in(emails)).run_sync()
+    run_sync(set_admin(emails, False))
     print("Done: " + ", ".join(emails))
+
+
+def read_rows(path):
+    """
+    Yields the numbered rows of a CSV or JSON Lines file, the JSON ones still
+    to be decoded so that they're reported like any other invalid row.
+    """
+    # utf-8-sig skips the byte order mark spreadsheets put in their exports.
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        if path.endswith(".csv"):
+            yield from enumerate(csv.DictReader(file), start=1)
+        else:
+            for number, line in enumerate(file, start=1):
+                if line.strip():
+                    yield number, line
+
+
+async def insert_tasks(paths):
+    matters = {
+        matter["abbr"]: matter for matter in await Matter.select(Matter.id, Matter.abbr)
+    }
+    count = 0
+    batch = []
+    weeks = set()
+    async with Task._meta.db.transaction():
+        for path in paths:
+            for number, row in read_rows(path):
+                try:
+                    if isinstance(row, str):
+                        row = json.loads(row)
+                    promotion, matter_id = validate_task(
+                        row["promotion"], row["type"], row["matter"], matters
+                    )
+                    task = Task(
+                        date=date.fromisoformat(row["date"]),
+                        promotion=promotion,
+                        type=row["type"],
+                        matter_id=matter_id,
+                        title=row["title"],
+                        content=row.get("content") or "",
+                    )
+                except Exception as e:
+                    raise Exception(f"{path}, row {number}: {e}") from e
+                batch.append(task)
+                weeks.add((promotion, *task.date.isocalendar()[:2]))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await Task.insert(*batch)
+                    count += len(batch)
+                    batch = []
+        if batch:
+            await Task.insert(*batch)
+            count += len(batch)
+        await PromotionVersion.bump(*weeks)
+    return count
+
+
+def import_tasks():
+    """
+    Imports tasks from CSV or JSON Lines files (one object per line), both with
+    the fields date, promotion, type, matter (abbr), title and content.
+    Nothing is imported if any row is invalid.
+    """
+    paths = sys.argv[1:]
+    start = time.perf_counter()
+    try:
+        count = run_sync(insert_tasks(paths))
+    except Exception as e:
+        sys.exit(f"Nothing imported, {e}")
+    elapsed = time.perf_counter() - start
+    print(f"Done: {count} tasks in {elapsed:.2f}s ({count / elapsed:.0f} rows/s)")
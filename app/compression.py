@@ -0,0 +1,87 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.etags import with_encoding
+
+try:
+    import brotli
+except ImportError:  # Gzip only without it.
+    brotli = None
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            return self.compressor.process(body) + self.compressor.flush()
+        return self.compressor.process(body) + self.compressor.finish()
+
+
+def accepted_encodings(headers: Headers) -> set:
+    encodings = set()
+    for part in headers.get("Accept-Encoding", "").split(","):
+        encoding, _, params = part.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(encoding.strip().lower())
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least `minimum_size` bytes with brotli when
+    the client accepts it and the brotli package is installed, with gzip
+    otherwise. The encoding is added to the ETag of compressed responses, as
+    a strong validator must differ between representations. Same as
+    Starlette's GZipMiddleware, which it builds on, for everything else.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope))
+        responder: ASGIApp
+        if brotli is not None and "br" in encodings:
+            responder = BrotliResponder(
+                self.app, self.minimum_size, quality=self.brotli_quality
+            )
+        elif "gzip" in encodings:
+            responder = GZipResponder(
+                self.app, self.minimum_size, compresslevel=self.gzip_level
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+
+        async def send_with_etag(message: Message) -> None:
+            # Responses the app encoded itself are left alone.
+            if (
+                message["type"] == "http.response.start"
+                and not responder.content_encoding_set
+            ):
+                headers = MutableHeaders(raw=message["headers"])
+                encoding = headers.get("Content-Encoding")
+                etag = headers.get("ETag")
+                if encoding and etag:
+                    headers["ETag"] = with_encoding(etag, encoding)
+            await send(message)
+
+        await responder(scope, receive, send_with_etag)
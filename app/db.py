@@ -0,0 +1,154 @@
+import asyncio
+import sqlite3
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+from piccolo.engine import engine_finder
+from piccolo.engine.sqlite import SQLiteEngine, dict_factory
+from piccolo.querystring import QueryString
+
+_connection: Optional[sqlite3.Connection] = None
+
+# Set to a one item list by whoever wants to count the queries run in the
+# current context (e.g. a GraphQL request), tasks spawned from it included.
+query_counter: ContextVar[Optional[List[int]]] = ContextVar(
+    "query_counter", default=None
+)
+
+
+def data_version() -> int:
+    """
+    SQLite's data_version changes every time another connection commits to the
+    database, whether from this process (Piccolo opens a new connection per
+    query) or another one (CLI, other workers). A dedicated connection is kept
+    open because the value is only meaningful within a single connection.
+    """
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(engine_finder().path, check_same_thread=False)
+    return _connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+class PooledSQLiteEngine(SQLiteEngine):
+    """
+    SQLiteEngine applying tuning pragmas to every connection it opens.
+
+    Once `start_connection_pool` is called (at server startup), reads are
+    served by a pool of long-lived read-only connections, and writes outside
+    transactions go through a single connection, one at a time. With WAL,
+    readers are never blocked by a writer. Transactions get a connection of
+    their own, like in SQLiteEngine: they're serialized with the other writes
+    by SQLite's lock, waiting up to `busy_timeout` for it.
+
+    Without the pool (CLI, migrations), every query gets a new connection,
+    like in SQLiteEngine.
+    """
+
+    __slots__ = (
+        "journal_mode",
+        "pragmas",
+        "read_pool_size",
+        "_readers",
+        "_writer",
+        "_write_lock",
+    )
+
+    def __init__(
+        self,
+        path: str = "piccolo.sqlite",
+        journal_mode: str = "wal",
+        synchronous: str = "normal",
+        busy_timeout: int = 5000,
+        mmap_size: int = 0,
+        cache_size: int = -2000,
+        read_pool_size: int = 4,
+        **kwargs,
+    ):
+        super().__init__(path=path, **kwargs)
+        self.journal_mode = journal_mode
+        self.pragmas: Dict[str, Any] = {
+            "foreign_keys": 1,
+            "synchronous": synchronous,
+            "busy_timeout": busy_timeout,
+            "mmap_size": mmap_size,
+            "cache_size": cache_size,
+        }
+        self.read_pool_size = read_pool_size
+        self._readers: Optional[asyncio.Queue] = None
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+
+    async def _connect(self, query_only: bool = False) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(**self.connection_kwargs)
+        connection.row_factory = dict_factory
+        pragmas = {**self.pragmas, "query_only": int(query_only)}
+        # Some pragmas return a row, executescript makes sure no statement is
+        # left open (and holding a lock) afterwards.
+        await connection.executescript(
+            "".join(f"PRAGMA {name} = {value};" for name, value in pragmas.items())
+        )
+        return connection
+
+    async def get_connection(self) -> aiosqlite.Connection:
+        # Used by Piccolo for transactions.
+        return await self._connect()
+
+    async def start_connection_pool(self):
+        if self._writer is not None:
+            return
+        self._writer = await self._connect()
+        # Unlike the other pragmas, the journal mode is stored in the database.
+        await self._writer.executescript(f"PRAGMA journal_mode = {self.journal_mode};")
+        self._readers = asyncio.Queue()
+        for _ in range(self.read_pool_size):
+            self._readers.put_nowait(await self._connect(query_only=True))
+
+    async def close_connection_pool(self):
+        if self._writer is None:
+            return
+        while not self._readers.empty():
+            await self._readers.get_nowait().close()
+        await self._writer.close()
+        self._readers = None
+        self._writer = None
+
+    async def run_querystring(self, querystring: QueryString, in_pool: bool = False):
+        counter = query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        return await super().run_querystring(querystring, in_pool=in_pool)
+
+    async def _run_in_new_connection(
+        self,
+        query: str,
+        args: Optional[List[Any]] = None,
+        query_type: str = "generic",
+        table=None,
+    ):
+        if args is None:
+            args = []
+
+        if self._writer is None:
+            connection = await self._connect()
+            try:
+                async with connection.execute(query, args) as cursor:
+                    response = await cursor.fetchall()
+                await connection.commit()
+                return response
+            finally:
+                await connection.close()
+
+        if query.lstrip()[:6].upper() == "SELECT":
+            connection = await self._readers.get()
+            try:
+                async with connection.execute(query, args) as cursor:
+                    return await cursor.fetchall()
+            finally:
+                self._readers.put_nowait(connection)
+
+        async with self._write_lock:
+            async with self._writer.execute(query, args) as cursor:
+                response = await cursor.fetchall()
+            await self._writer.commit()
+            return response
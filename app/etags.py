@@ -0,0 +1,36 @@
+from typing import Optional
+
+# Content codings the compression middleware adds to the ETags of the
+# responses it encodes, so each representation has its own strong validator.
+ENCODINGS = ("br", "gzip")
+
+
+def with_encoding(etag: str, encoding: str) -> str:
+    """
+    ETag of the `encoding` coded representation of the response with `etag`.
+    """
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def match_etag(etag: str, if_none_match: str) -> Optional[str]:
+    """
+    Returns the tag of an If-None-Match header that matches `etag`, or None.
+
+    The comparison is weak (RFC 9110, 13.1.2): proxies that compress the body
+    turn strong ETags into weak ones, which clients then send back. Tags of
+    encoded representations match the ETag they were derived from, and `*`
+    matches anything.
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return etag
+        tag = tag[2:] if tag.startswith("W/") else tag
+        identity = tag
+        for encoding in ENCODINGS:
+            if tag.endswith(f'-{encoding}"'):
+                identity = tag[: -len(encoding) - 2] + '"'
+                break
+        if identity == etag:
+            return tag
+    return None
@@ -0,0 +1,134 @@
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from app.catalog import catalog
+from app.etags import match_etag
+from app.models import PromotionVersion, Task
+
+HISTORY = timedelta(days=365)
+BATCH_SIZE = 500
+
+
+def escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    # Lines longer than 75 octets must be folded (RFC 5545, 3.1).
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while encoded:
+        size = 75 if not parts else 74
+        # Don't split a multi-byte character.
+        while size < len(encoded) and encoded[size] & 0xC0 == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+async def events(promotion: str, start: date, stamp: str) -> AsyncIterator[str]:
+    matters = (await catalog.get()).by_id
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//etml.burkhalter.dev//agenda//FR\r\n"
+        + fold(f"X-WR-CALNAME:{escape(promotion.upper())}")
+    )
+    last = None
+    while True:
+        where = (Task.promotion == promotion) & (Task.date >= start)
+        if last:
+            where &= (Task.date > last["date"]) | (
+                (Task.date == last["date"]) & (Task.id > last["id"])
+            )
+        tasks = (
+            await Task.select()
+            .where(where)
+            .order_by(Task.date, Task.id)
+            .limit(BATCH_SIZE)
+        )
+        chunk = []
+        for task in tasks:
+            matter = matters.get(task["matter_id"])
+            summary = task["title"]
+            if matter and matter["short_name"]:
+                summary = f"{matter['short_name']}: {summary}"
+            chunk += [
+                "BEGIN:VEVENT\r\n",
+                f"UID:task-{task['id']}@etml.burkhalter.dev\r\n",
+                f"DTSTAMP:{stamp}\r\n",
+                f"DTSTART;VALUE=DATE:{task['date']:%Y%m%d}\r\n",
+                f"DTEND;VALUE=DATE:{task['date'] + timedelta(1):%Y%m%d}\r\n",
+                fold(f"SUMMARY:{escape(summary)}"),
+                fold(f"CATEGORIES:{escape(task['type'])}"),
+                fold(f"DESCRIPTION:{escape(task['content'])}"),
+                "END:VEVENT\r\n",
+            ]
+        yield "".join(chunk)
+        if len(tasks) < BATCH_SIZE:
+            break
+        last = tasks[-1]
+    yield "END:VCALENDAR\r\n"
+
+
+async def calendar(request: Request) -> Response:
+    promotion = request.path_params["promotion"].lower()
+    start = date.today() - HISTORY
+
+    version = (
+        await PromotionVersion.select()
+        .where(PromotionVersion.promotion == promotion)
+        .first()
+    )
+    matters = await catalog.get()
+    updated_at = max(
+        (
+            version["updated_at"].replace(tzinfo=timezone.utc, microsecond=0)
+            if version
+            else datetime.fromtimestamp(0, timezone.utc)
+        ),
+        # Summaries include the matters' names.
+        matters.changed_at,
+    )
+    # The feed also depends on the day, as older tasks fall out of it.
+    etag = (
+        f'"{version["version"] if version else 0}-{start:%Y%m%d}'
+        f'-{matters.digest[:16]}"'
+    )
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(updated_at, usegmt=True),
+        "Cache-Control": "public, max-age=300",
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_none_match is not None:
+        matched = match_etag(etag, if_none_match)
+        if matched is not None:
+            return Response(status_code=304, headers={**headers, "ETag": matched})
+    elif if_modified_since is not None:
+        try:
+            if updated_at <= parsedate_to_datetime(if_modified_since):
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    return StreamingResponse(
+        events(promotion, start, f"{updated_at:%Y%m%dT%H%M%SZ}"),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
+    )
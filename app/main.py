@@ -1,22 +1,74 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
 from dotenv import load_dotenv
+from piccolo.engine import engine_finder
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 from starlette.routing import Route, WebSocketRoute
 
+from app.cache import CACHES
+from app import metrics as app_metrics
+from app.catalog import catalog
+from app.compression import CompressionMiddleware
+from app.ical import calendar
+from app.models import Matter
 from app.schemas import GraphQL, schema
+from app.schemas.agenda import watch_changes
 
 async def status(request):
     return PlainTextResponse("OK")
 
+
+async def ready(request):
+    if not request.app.state.ready:
+        return PlainTextResponse("Not ready", status_code=503)
+    try:
+        await Matter.raw("SELECT 1")
+    except Exception:
+        return PlainTextResponse("Database unavailable", status_code=503)
+    return PlainTextResponse("OK")
+
+
+async def caches(request):
+    return JSONResponse({name: cache.stats() for name, cache in CACHES.items()})
+
+
+async def metrics(request):
+    return PlainTextResponse(
+        app_metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    engine = engine_finder()
+    await engine.start_connection_pool()
+    await catalog.load()
+    watcher = asyncio.create_task(watch_changes(CHANGES_POLL_INTERVAL))
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    watcher.cancel()
+    await engine.close_connection_pool()
+
 load_dotenv()
 
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
 WEB_PORT = int(os.environ.get("WEB_PORT", 8000))
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", 0)) or os.cpu_count() or 1
+WEB_SHUTDOWN_TIMEOUT = int(os.environ.get("WEB_SHUTDOWN_TIMEOUT", 30))
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", 500))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+CHANGES_POLL_INTERVAL = float(os.environ.get("CHANGES_POLL_INTERVAL", 1))
+# Addresses of the reverse proxies trusted to set X-Forwarded-For, which is
+# what clients are told apart by (rate limits).
+FORWARDED_ALLOW_IPS = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
 
 IS_PROD = ENVIRONMENT == "prod"
 IS_DEV = ENVIRONMENT == "dev"
@@ -25,6 +77,10 @@ graphql_app = GraphQL(schema) #, graphiql=IS_DEV)
 app = Starlette(
     routes=[
         Route("/status", status),
+        Route("/status/ready", ready),
+        Route("/status/caches", caches),
+        Route("/metrics", metrics),
+        Route("/calendar/{promotion}.ics", calendar),
         Route("/graphql", graphql_app),
         WebSocketRoute("/graphql", graphql_app),
     ],
@@ -35,10 +91,39 @@ app = Starlette(
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
-        )
-    ]
+        ),
+        Middleware(
+            CompressionMiddleware,
+            minimum_size=COMPRESSION_MINIMUM_SIZE,
+            gzip_level=GZIP_LEVEL,
+            brotli_quality=BROTLI_QUALITY,
+        ),
+    ],
+    lifespan=lifespan,
 )
+app.state.ready = False
 
 
 def start():
-    uvicorn.run("app.main:app", host="0.0.0.0", port=WEB_PORT, reload=IS_DEV)
+    if IS_PROD:
+        # Every worker is a separate process with its own caches and
+        # subscribers, they stay coherent through SQLite's data_version (see
+        # app.db, app.catalog and the PromotionWatcher and UserWatcher).
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=WEB_PORT,
+            workers=WEB_WORKERS,
+            proxy_headers=True,
+            forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+            timeout_graceful_shutdown=WEB_SHUTDOWN_TIMEOUT,
+        )
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=WEB_PORT,
+            reload=IS_DEV,
+            proxy_headers=True,
+            forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        )
@@ -0,0 +1,136 @@
+import os
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Operation names come from clients, past this many distinct names they are
+# all reported as "other".
+MAX_OPERATIONS = int(os.environ.get("METRICS_MAX_OPERATIONS", 100))
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Per label values, keeps the count of observations in each bucket (not
+    cumulative, summed on render to keep `observe` cheap), their sum and count.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        data = self.values.get(labels)
+        if data is None:
+            data = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        data[0][bisect_left(self.buckets, value)] += 1
+        data[1] += value
+        data[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = bound if isinstance(bound, str) else repr(float(bound))
+                lines.append(
+                    f"{self.name}_bucket{format_labels(names, labels + (le,))} "
+                    f"{cumulative}"
+                )
+            suffix = format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+_operations: set = set()
+
+
+def operation_label(name: str) -> str:
+    if not name:
+        return "anonymous"
+    if name not in _operations:
+        if len(_operations) >= MAX_OPERATIONS:
+            return "other"
+        _operations.add(name)
+    return name
+
+
+operation_duration = Histogram(
+    "graphql_operation_duration_seconds",
+    "Time spent on GraphQL operations.",
+    ["operation", "type"],
+)
+field_duration = Histogram(
+    "graphql_field_duration_seconds",
+    "Time spent in GraphQL field resolvers, default resolvers excluded.",
+    ["field"],
+)
+operation_queries = Histogram(
+    "graphql_operation_db_queries",
+    "Database queries run by GraphQL operations.",
+    ["operation"],
+    buckets=COUNT_BUCKETS,
+)
+operation_errors = Counter(
+    "graphql_operation_errors_total",
+    "GraphQL operations that returned errors.",
+    ["operation"],
+)
+rate_limited = Counter(
+    "graphql_rate_limited_total",
+    "GraphQL fields rejected by rate limiting.",
+    ["field"],
+)
+
+METRICS = [
+    operation_duration,
+    field_duration,
+    operation_queries,
+    operation_errors,
+    rate_limited,
+]
+
+
+def render() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
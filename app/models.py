@@ -1,7 +1,19 @@
 from enum import Enum
+from typing import Dict, Tuple
 
 from piccolo.apps.user.tables import BaseUser as User
-from piccolo.columns import Boolean, Date, ForeignKey, OnDelete, Serial, Text, Varchar
+from piccolo.columns import (
+    Boolean,
+    Date,
+    ForeignKey,
+    Integer,
+    OnDelete,
+    Serial,
+    Text,
+    Timestamp,
+    Varchar,
+)
+from piccolo.columns.defaults.timestamp import TimestampNow
 from piccolo.table import Table
 
 # After changes in this file, you have to create a migration:
@@ -41,4 +53,92 @@ class Task(Table):
     content = Text()
 
 
-TABLES = [Matter, Profile, Task]
+class PromotionVersion(Table):
+    """
+    Bumped on every change to the tasks of a promotion, so clients and caches
+    can tell whether anything changed without looking at the tasks.
+    """
+
+    promotion = Varchar(length=8, unique=True)
+    version = Integer()
+    updated_at = Timestamp(default=TimestampNow())
+
+    @classmethod
+    async def bump(cls, *weeks: Tuple[str, int, int]) -> Dict[str, int]:
+        """
+        Bumps the promotions of the (promotion, ISO year, ISO week) `weeks` and
+        records their new version on each week, so that other processes can
+        tell which weeks changed. Returns the new versions.
+        """
+        versions = {}
+        async with cls._meta.db.transaction():
+            # CURRENT_TIMESTAMP is in UTC.
+            for promotion in sorted({promotion for promotion, _, _ in weeks}):
+                rows = await cls.raw(
+                    "INSERT INTO promotion_version (promotion, version, updated_at) "
+                    "VALUES ({}, 1, CURRENT_TIMESTAMP) ON CONFLICT (promotion) "
+                    "DO UPDATE SET version = version + 1, "
+                    "updated_at = CURRENT_TIMESTAMP RETURNING version",
+                    promotion,
+                )
+                versions[promotion] = rows[0]["version"]
+            for promotion, year, number in set(weeks):
+                await WeekVersion.raw(
+                    "INSERT INTO week_version (promotion, year, number, version) "
+                    "VALUES ({}, {}, {}, {}) ON CONFLICT (promotion, year, number) "
+                    "DO UPDATE SET version = excluded.version",
+                    promotion,
+                    year,
+                    number,
+                    versions[promotion],
+                )
+        return versions
+
+
+class WeekVersion(Table):
+    """
+    Version of its promotion in which a week last changed. Weeks are unique,
+    see the migration adding the index.
+    """
+
+    promotion = Varchar(length=8)
+    year = Integer()
+    number = Integer()
+    version = Integer()
+
+
+class UserVersion(Table):
+    """
+    Bumped for the users whose cached identity (names, email, admin) changed,
+    so that every process forgets them.
+    """
+
+    user_id = Integer(unique=True)
+    version = Integer()
+
+    @classmethod
+    async def bump(cls, *user_ids: int):
+        for user_id in set(user_ids):
+            await cls.raw(
+                "INSERT INTO user_version (user_id, version) "
+                "VALUES ({}, (SELECT COALESCE(MAX(version), 0) + 1 FROM user_version)) "
+                "ON CONFLICT (user_id) DO UPDATE SET version = excluded.version",
+                user_id,
+            )
+
+
+TABLES = [Matter, Profile, Task, PromotionVersion, WeekVersion, UserVersion]
+
+# Multicolumn indexes can't be declared on the columns themselves, so they're
+# listed here and created by a raw migration. Keep both in sync.
+INDEXES = [
+    (Task, [Task.promotion, Task.date]),
+    # Task history by matter or type. SQLite appends the id to every index, so
+    # these are ordered by (date, id) for keyset pagination.
+    (Task, [Task.promotion, Task.matter_id, Task.date]),
+    (Task, [Task.promotion, Task.type, Task.date]),
+    # Covers the month overview, which would otherwise count on the index
+    # above, across every year of the promotion.
+    (Task, [Task.promotion, Task.date, Task.type]),
+    (Profile, [Profile.promotion, Profile.is_public]),
+]
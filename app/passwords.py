@@ -0,0 +1,76 @@
+import asyncio
+import datetime
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.models import User
+
+# PBKDF2 with Piccolo's iteration count takes hundreds of milliseconds. It
+# releases the GIL, so hashing in threads keeps the event loop serving other
+# requests meanwhile.
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", 2))
+MAX_CONCURRENT_LOGINS = int(os.environ.get("MAX_CONCURRENT_LOGINS", 8))
+
+executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+# Logins waiting for a hashing thread beyond this are queued here, before
+# touching the database.
+slots = asyncio.Semaphore(MAX_CONCURRENT_LOGINS)
+
+
+async def hash_password(
+    password: str, salt: str = "", iterations: Optional[int] = None
+) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, User.hash_password, password, salt, iterations
+    )
+
+
+async def login(username: str, password: str) -> Optional[int]:
+    """
+    Same as `User.login`, with the password hashed off the event loop.
+    """
+    if len(username) > User.username.length:
+        return None
+    if len(password) > User._max_password_length:
+        return None
+
+    async with slots:
+        user = (
+            await User.select(User.id, User.password)
+            .where(User.username == username)
+            .first()
+        )
+        if not user:
+            # Hash anyway, so that response times don't reveal which users
+            # exist.
+            await hash_password(password)
+            return None
+
+        _, iterations, salt, _ = User.split_stored_password(user["password"])
+        hashed = await hash_password(password, salt, int(iterations))
+        if not hmac.compare_digest(hashed, user["password"]):
+            return None
+
+        values = {User.last_login: datetime.datetime.now()}
+        if int(iterations) != User._pbkdf2_iteration_count:
+            values[User.password] = await hash_password(password)
+        await User.update(values).where(User.id == user["id"])
+        return user["id"]
+
+
+async def create_user(username: str, password: str, **extra_params) -> User:
+    """
+    Same as `User.create_user`, with the password hashed off the event loop.
+    """
+    if not username:
+        raise ValueError("A username must be provided.")
+    User._validate_password(password=password)
+
+    async with slots:
+        hashed = await hash_password(password)
+    user = User(username=username, password=hashed, **extra_params)
+    await user.save()
+    return user
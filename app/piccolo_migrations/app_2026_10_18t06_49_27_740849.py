@@ -0,0 +1,39 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.table import Table
+
+
+class Profile(Table, tablename="profile"):
+    pass
+
+
+class Task(Table, tablename="task"):
+    pass
+
+
+ID = "2026-10-18T06:49:27:740849"
+VERSION = "1.34.0"
+DESCRIPTION = "Composite indexes for week and profiles queries"
+
+INDEXES = [
+    (Task, ["promotion", "date"]),
+    (Profile, ["promotion", "is_public"]),
+]
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="app", description=DESCRIPTION
+    )
+
+    async def run():
+        for table, columns in INDEXES:
+            await table.create_index(columns, if_not_exists=True)
+
+    async def run_backwards():
+        for table, columns in INDEXES:
+            await table.drop_index(columns, if_exists=True)
+
+    manager.add_raw(run)
+    manager.add_raw_backwards(run_backwards)
+
+    return manager
@@ -0,0 +1,87 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.columns.column_types import Integer
+from piccolo.columns.column_types import Timestamp
+from piccolo.columns.column_types import Varchar
+from piccolo.columns.defaults.timestamp import TimestampNow
+from piccolo.columns.indexes import IndexMethod
+
+ID = "2026-10-18T07:00:13:627645"
+VERSION = "1.34.0"
+DESCRIPTION = "Promotion versions"
+
+
+async def forwards():
+    manager = MigrationManager(migration_id=ID, app_name="app", description=DESCRIPTION)
+
+    manager.add_table(
+        class_name="PromotionVersion",
+        tablename="promotion_version",
+        schema=None,
+        columns=None,
+    )
+
+    manager.add_column(
+        table_class_name="PromotionVersion",
+        tablename="promotion_version",
+        column_name="promotion",
+        db_column_name="promotion",
+        column_class_name="Varchar",
+        column_class=Varchar,
+        params={
+            "length": 8,
+            "default": "",
+            "null": False,
+            "primary_key": False,
+            "unique": True,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+        schema=None,
+    )
+
+    manager.add_column(
+        table_class_name="PromotionVersion",
+        tablename="promotion_version",
+        column_name="version",
+        db_column_name="version",
+        column_class_name="Integer",
+        column_class=Integer,
+        params={
+            "default": 0,
+            "null": False,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+        schema=None,
+    )
+
+    manager.add_column(
+        table_class_name="PromotionVersion",
+        tablename="promotion_version",
+        column_name="updated_at",
+        db_column_name="updated_at",
+        column_class_name="Timestamp",
+        column_class=Timestamp,
+        params={
+            "default": TimestampNow(),
+            "null": False,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+        schema=None,
+    )
+
+    return manager
@@ -0,0 +1,70 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.table import Table
+
+
+class Task(Table, tablename="task"):
+    pass
+
+
+ID = "2026-10-18T07:15:27:318204"
+VERSION = "1.34.0"
+DESCRIPTION = "Full-text search index on tasks"
+
+# External content table: only the index is stored, the text stays in `task`.
+# The promotion is indexed too, so searches are restricted to a promotion by
+# the index itself.
+FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE task_search USING fts5(
+        promotion, title, content,
+        content='task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER task_search_insert AFTER INSERT ON task BEGIN
+        INSERT INTO task_search(rowid, promotion, title, content)
+        VALUES (new.id, new.promotion, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_delete AFTER DELETE ON task BEGIN
+        INSERT INTO task_search(task_search, rowid, promotion, title, content)
+        VALUES ('delete', old.id, old.promotion, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_update
+    AFTER UPDATE OF promotion, title, content ON task BEGIN
+        INSERT INTO task_search(task_search, rowid, promotion, title, content)
+        VALUES ('delete', old.id, old.promotion, old.title, old.content);
+        INSERT INTO task_search(rowid, promotion, title, content)
+        VALUES (new.id, new.promotion, new.title, new.content);
+    END
+    """,
+    "INSERT INTO task_search(task_search) VALUES ('rebuild')",
+]
+
+BACKWARDS = [
+    "DROP TRIGGER IF EXISTS task_search_update",
+    "DROP TRIGGER IF EXISTS task_search_delete",
+    "DROP TRIGGER IF EXISTS task_search_insert",
+    "DROP TABLE IF EXISTS task_search",
+]
+
+
+async def forwards():
+    manager = MigrationManager(migration_id=ID, app_name="app", description=DESCRIPTION)
+
+    async def run():
+        for statement in FORWARDS:
+            await Task.raw(statement)
+
+    async def run_backwards():
+        for statement in BACKWARDS:
+            await Task.raw(statement)
+
+    manager.add_raw(run)
+    manager.add_raw_backwards(run_backwards)
+
+    return manager
@@ -0,0 +1,39 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.table import Table
+
+
+class WeekVersion(Table, tablename="week_version"):
+    pass
+
+
+ID = "2026-10-18T07:38:40:902114"
+VERSION = "1.34.0"
+DESCRIPTION = "Unique weeks in week versions"
+
+# Target of the upsert in PromotionVersion.bump, separate from the previous
+# migration because raw statements run before the tables are created.
+FORWARDS = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS week_version_promotion_year_number "
+    "ON week_version (promotion, year, number)",
+]
+
+BACKWARDS = [
+    "DROP INDEX IF EXISTS week_version_promotion_year_number",
+]
+
+
+async def forwards():
+    manager = MigrationManager(migration_id=ID, app_name="app", description=DESCRIPTION)
+
+    async def run():
+        for statement in FORWARDS:
+            await WeekVersion.raw(statement)
+
+    async def run_backwards():
+        for statement in BACKWARDS:
+            await WeekVersion.raw(statement)
+
+    manager.add_raw(run)
+    manager.add_raw_backwards(run_backwards)
+
+    return manager
@@ -0,0 +1,38 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Hashable, Set
+
+
+class Hub:
+    """
+    In-process publish/subscribe. Every subscriber gets its own bounded queue;
+    a subscriber that doesn't keep up loses its oldest messages rather than
+    slowing down the publisher.
+    """
+
+    def __init__(self, queue_size: int = 16):
+        self.queue_size = queue_size
+        self.channels: Dict[Hashable, Set[asyncio.Queue]] = defaultdict(set)
+
+    def has_subscribers(self, channel: Hashable) -> bool:
+        return bool(self.channels.get(channel))
+
+    def publish(self, channel: Hashable, message: Any):
+        for queue in self.channels.get(channel, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: Hashable) -> AsyncIterator[Any]:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.channels[channel].add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.channels[channel].discard(queue)
+            if not self.channels[channel]:
+                del self.channels[channel]
+
+
+hub = Hub()
@@ -0,0 +1,65 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+
+class TokenBuckets:
+    """
+    One token bucket per key, holding up to `capacity` tokens and refilled at
+    `capacity` tokens per `period` seconds.
+
+    Buckets are only kept for the `maxsize` most recently used keys: the least
+    recently used one has been idle the longest and is the most likely to be
+    full again, which is the same as not having a bucket.
+    """
+
+    def __init__(self, capacity: int, period: float, maxsize: int = 10000):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: Hashable, tokens: int = 1) -> float:
+        """
+        Takes `tokens` from the bucket of `key` and returns 0, or returns the
+        seconds to wait until there are enough of them without taking any.
+        """
+        now = time.monotonic()
+        available, updated = self._buckets.get(key, (self.capacity, now))
+        available = min(self.capacity, available + (now - updated) * self.rate)
+        allowed = tokens <= available
+        self._buckets[key] = (available - tokens if allowed else available, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+
+        if allowed:
+            return 0
+        if tokens > self.capacity:
+            return math.inf
+        return (tokens - available) / self.rate
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, float]]:
+    """
+    Parses `field=capacity/period,...`, such as `login=10/60,register=5/3600`,
+    into `{field: (capacity, period)}`.
+    """
+    limits = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        try:
+            field, limit = item.split("=")
+            capacity, period = limit.split("/")
+            limits[field.strip()] = (int(capacity), float(period))
+        except ValueError:
+            raise ValueError(
+                f"Invalid rate limit {item.strip()!r}, expected field=capacity/period."
+            ) from None
+    return limits
@@ -1,21 +1,251 @@
-from typing import Any, Optional, Union
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Mapping, Optional, Union
 
 import jwt
 import strawberry
+from graphql import GraphQLError
 from starlette import requests, responses, websockets
+from starlette.websockets import WebSocketDisconnect
+from strawberry.asgi import ASGIWebSocketAdapter
 from strawberry.asgi import GraphQL as _GraphQL
+from strawberry.extensions import (
+    AddValidationRules,
+    MaxAliasesLimiter,
+    ParserCache,
+    QueryDepthLimiter,
+    ValidationCache,
+)
+from strawberry.http import GraphQLRequestData
+from strawberry.http.exceptions import WebSocketDisconnected
+from strawberry.types import ExecutionResult
+from strawberry.types.unset import UNSET
 
-from app.models import User
-from app.schemas import agenda, auth, types, user
+try:
+    import orjson
+except ImportError:  # Responses are encoded by json without it.
+    orjson = None
+
+from app.cache import MISSING, LRUCache, register
+from app.db import data_version
+from app.etags import match_etag
+from app.models import User, UserVersion
+from app.ratelimit import TokenBuckets, parse_limits
+from app.schemas import agenda, auth, history, loaders, search, types, user
+from app.schemas.extensions import Metrics, QueryCost, RateLimit
+from app.schemas.http_cache import compute_etag, public_promotions
+from app.schemas.projection import USER_COLUMNS
+
+user_cache = register(
+    "user",
+    LRUCache(
+        maxsize=int(os.environ.get("USER_CACHE_SIZE", 4096)),
+        ttl=float(os.environ.get("USER_CACHE_TTL", 60)),
+    ),
+)
+
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", 1024))
+MAX_QUERY_DEPTH = int(os.environ.get("MAX_QUERY_DEPTH", 8))
+MAX_QUERY_ALIASES = int(os.environ.get("MAX_QUERY_ALIASES", 15))
+MAX_QUERY_COST = int(os.environ.get("MAX_QUERY_COST", 1000))
+GRAPHQL_MAX_AGE = int(os.environ.get("GRAPHQL_MAX_AGE", 0))
+RATE_LIMITS = parse_limits(
+    os.environ.get(
+        "RATE_LIMITS",
+        "login=120/60,register=100/3600,searchTasks=60/60,weeks=60/60,"
+        "upsertTasks=30/60",
+    )
+)
+RATE_LIMIT_KEYS = int(os.environ.get("RATE_LIMIT_KEYS", 10000))
+
+# The limiters build a new rule class per instance: create them once so that
+# ValidationCache, keyed on the rules, keeps hitting across requests.
+LIMIT_RULES = [
+    *QueryDepthLimiter(max_depth=MAX_QUERY_DEPTH).validation_rules,
+    *MaxAliasesLimiter(max_alias_count=MAX_QUERY_ALIASES).validation_rules,
+]
+persisted_queries = register("persisted_query", LRUCache(maxsize=QUERY_CACHE_SIZE))
+# Shared by all requests of a process, not between workers.
+rate_limits = {
+    field: TokenBuckets(capacity, period, maxsize=RATE_LIMIT_KEYS)
+    for field, (capacity, period) in RATE_LIMITS.items()
+}
+
+
+def forget_users(*ids: int):
+    """
+    Drops the cached identities of the tokens of these users, so they're
+    resolved again.
+    """
+    user_cache.invalidate_where(lambda token, user: user.id in ids)
+
+
+class UserWatcher:
+    """
+    Forgets the users bumped in UserVersion by anyone, including other
+    processes (CLI, workers), since the last call to `refresh`. The versions
+    are only read when SQLite's data_version says something was written.
+    """
+
+    def __init__(self):
+        self.data_version: Optional[int] = None
+        self.version = 0
+        self.lock = asyncio.Lock()
+
+    async def refresh(self):
+        if data_version() == self.data_version:
+            return
+        async with self.lock:
+            version = data_version()
+            if version == self.data_version:
+                return
+            # Nothing is cached before the first refresh.
+            first = self.data_version is None
+            self.data_version = version
+            rows = await UserVersion.select(
+                UserVersion.user_id, UserVersion.version
+            ).where(UserVersion.version > self.version)
+            if not rows:
+                return
+            if not first:
+                forget_users(*[row["user_id"] for row in rows])
+            self.version = max(row["version"] for row in rows)
+
+
+user_watcher = UserWatcher()
+
+
+def persisted_query_error(message: str, code: str) -> ExecutionResult:
+    return ExecutionResult(
+        data=None, errors=[GraphQLError(message, extensions={"code": code})]
+    )
+
+
+class WebSocketAdapter(ASGIWebSocketAdapter):
+    async def send_json(self, message: Mapping[str, object]) -> None:
+        # GraphQL over WebSocket clients expect text frames, the view encodes
+        # to bytes with orjson.
+        encoded = self.view.encode_json(message)
+        if isinstance(encoded, bytes):
+            encoded = encoded.decode()
+        try:
+            await self.ws.send_text(encoded)
+        except WebSocketDisconnect as exc:
+            raise WebSocketDisconnected from exc
 
 
 class GraphQL(_GraphQL):
+    websocket_adapter_class = WebSocketAdapter
+
+    def encode_json(self, data: object) -> Union[str, bytes]:
+        if orjson is None:
+            return super().encode_json(data)
+        return orjson.dumps(data)
+
+    async def execute_single(self, *args, request_data: GraphQLRequestData, **kwargs):
+        # Automatic persisted queries: clients send the sha256 of the query and
+        # only send the full text again when it's unknown to us.
+        persisted_query = (request_data.extensions or {}).get("persistedQuery")
+        if persisted_query:
+            sha256_hash = persisted_query.get("sha256Hash")
+            if request_data.query is None:
+                request_data.query = persisted_queries.get(sha256_hash)
+                if request_data.query is None:
+                    return persisted_query_error(
+                        "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+                    )
+            elif hashlib.sha256(request_data.query.encode()).hexdigest() != sha256_hash:
+                return persisted_query_error(
+                    "provided sha does not match query", "INVALID_SHA256_HASH"
+                )
+            else:
+                persisted_queries.set(sha256_hash, request_data.query)
+
+        return await super().execute_single(*args, request_data=request_data, **kwargs)
+
+    async def run(self, request, context=UNSET, root_value=UNSET):
+        if not isinstance(request, requests.Request) or request.method != "GET":
+            response = await super().run(request, context, root_value)
+            if isinstance(response, responses.Response):
+                response.headers.setdefault("Cache-Control", "no-store")
+            return response
+
+        # Public GET queries get an ETag, computed before running anything so
+        # that revalidations are answered without resolving the query.
+        etag = await self.get_etag(request)
+        headers = {}
+        if etag is not None:
+            max_age = f"max-age={GRAPHQL_MAX_AGE}" if GRAPHQL_MAX_AGE else "no-cache"
+            headers = {"ETag": etag, "Cache-Control": f"public, {max_age}"}
+            matched = match_etag(etag, request.headers.get("If-None-Match", ""))
+            if matched is not None:
+                # The tag of the representation the client has, which may be
+                # a compressed one.
+                headers["ETag"] = matched
+                return responses.Response(status_code=304, headers=headers)
+
+        response = await super().run(request, context, root_value)
+        if (
+            headers
+            and response.status_code == 200
+            and not getattr(request.state, "graphql_errors", False)
+        ):
+            response.headers.update(headers)
+        else:
+            response.headers.setdefault("Cache-Control", "no-store")
+        return response
+
+    async def get_etag(self, request: requests.Request) -> Optional[str]:
+        params = request.query_params
+        try:
+            variables = json.loads(params.get("variables") or "null")
+            extensions = json.loads(params.get("extensions") or "{}")
+        except ValueError:
+            return None
+        query = params.get("query")
+        if not isinstance(variables, (dict, type(None))) or not isinstance(
+            extensions, dict
+        ):
+            return None
+        if query is None:
+            persisted_query = extensions.get("persistedQuery")
+            if isinstance(persisted_query, dict):
+                query = persisted_queries.get(persisted_query.get("sha256Hash"))
+        if query is None:
+            return None
+
+        operation_name = params.get("operationName")
+        promotions = public_promotions(query, operation_name, variables)
+        if promotions is None:
+            return None
+        return await compute_etag(query, operation_name, variables, promotions)
+
+    async def process_result(self, request, result):
+        # Responses with errors aren't cacheable.
+        if result.errors:
+            request.state.graphql_errors = True
+        return await super().process_result(request, result)
+
+    def should_render_graphql_ide(self, request) -> bool:
+        # A GET with only a persisted query hash has no query either.
+        return (
+            super().should_render_graphql_ide(request)
+            and "extensions" not in request.query_params
+        )
+
     async def get_context(
         self,
         request: Union[requests.Request, websockets.WebSocket],
         response: Optional[responses.Response] = None,
     ) -> Any:
-        return {"user": await self._get_user(request)}
+        return {
+            "request": request,
+            "response": response,
+            "user": await self._get_user(request),
+            **loaders.create_loaders(),
+        }
 
     async def _get_user(
         self,
@@ -29,23 +259,34 @@ class GraphQL(_GraphQL):
         if authorization is None:
             return None
 
+        await user_watcher.refresh()
+        cached = user_cache.get(authorization, MISSING)
+        if cached is not MISSING:
+            return cached
+
         payload = jwt.decode(authorization, auth.SECRET, ["HS256"])
-        user = await User.select().where(User.id == int(payload["sub"])).first()
-        return (
-            types.User(
-                id=user["id"],
-                first_name=user["first_name"],
-                last_name=user["last_name"],
-                email=user["email"],
-                admin=user["admin"],
-            )
-            if user
-            else None
+        generation = user_cache.generation
+        user = (
+            await User.select(*USER_COLUMNS.values())
+            .where(User.id == int(payload["sub"]))
+            .first()
+        )
+        if user is None:
+            return None
+
+        user = types.User(
+            id=user["id"],
+            first_name=user["first_name"],
+            last_name=user["last_name"],
+            email=user["email"],
+            admin=user["admin"],
         )
+        user_cache.set(authorization, user, generation)
+        return user
 
 
 @strawberry.type
-class Query(agenda.Query, auth.Query, user.Query):
+class Query(agenda.Query, auth.Query, history.Query, search.Query, user.Query):
     pass
 
 
@@ -54,4 +295,23 @@ class Mutation(agenda.Mutation, auth.Mutation):
     pass
 
 
-schema = strawberry.Schema(Query, Mutation)
+@strawberry.type
+class Subscription(agenda.Subscription):
+    pass
+
+
+schema = strawberry.Schema(
+    Query,
+    Mutation,
+    Subscription,
+    extensions=[
+        # First, so it measures the time spent in the other extensions too.
+        Metrics,
+        lambda: ParserCache(maxsize=QUERY_CACHE_SIZE),
+        lambda: ValidationCache(maxsize=QUERY_CACHE_SIZE),
+        lambda: AddValidationRules(LIMIT_RULES),
+        # After ValidationCache, so its errors aren't overwritten by it.
+        lambda: QueryCost(max_cost=MAX_QUERY_COST),
+        lambda: RateLimit(rate_limits),
+    ],
+)
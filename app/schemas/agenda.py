@@ -1,23 +1,306 @@
-import re
+import asyncio
+import calendar
+import logging
+import os
+from collections import defaultdict
 from datetime import date, timedelta
-from typing import List, Optional
+from typing import AsyncGenerator, Dict, List, Optional, Sequence, Set, Tuple
 
 import strawberry
+from piccolo.columns import Column
+from piccolo.query.functions.aggregate import Count
+from strawberry.types import Info
 
-from app.models import Matter, Task
+from app.cache import LRUCache, register
+from app.catalog import catalog
+from app.db import data_version
+from app.models import PromotionVersion, Task, WeekVersion
+from app.pubsub import hub
 from app.schemas import types
+from app.schemas.projection import TASK_COLUMNS, project
+from app.validation import ALLOWED_TYPES, validate_task
 
+logger = logging.getLogger(__name__)
 
-def daterange(start_date, end_date, inclusive=True):
-    for n in range((end_date - start_date).days + inclusive):
+MAX_WEEKS = 53
+# Keeps the inserts well within SQLite's limit on bound variables.
+MAX_UPSERT_TASKS = 500
+
+week_cache = register(
+    "week",
+    LRUCache(
+        maxsize=int(os.environ.get("WEEK_CACHE_SIZE", 1024)),
+        ttl=float(os.environ.get("WEEK_CACHE_TTL", 300)),
+    ),
+)
+
+month_cache = register(
+    "month",
+    LRUCache(
+        maxsize=int(os.environ.get("MONTH_CACHE_SIZE", 1024)),
+        ttl=float(os.environ.get("MONTH_CACHE_TTL", 300)),
+    ),
+)
+
+
+class PromotionWatcher:
+    """
+    Tells which weeks had their tasks changed by other processes (workers, CLI)
+    since the last call to `changed`, and the current version of promotions.
+    The versions are only read when SQLite's data_version says something was
+    written, and the bumps of this process are ignored once `record`ed.
+    """
+
+    def __init__(self):
+        self.data_version: Optional[int] = None
+        self.versions: Dict[str, int] = {}
+        self.pending: Set[Tuple[str, int, int]] = set()
+        self.lock = asyncio.Lock()
+
+    async def refresh(self):
+        if data_version() == self.data_version:
+            return
+        async with self.lock:
+            version = data_version()
+            if version == self.data_version:
+                return
+            # Nothing is cached before the first refresh.
+            first = self.data_version is None
+            self.data_version = version
+            rows = await PromotionVersion.select(
+                PromotionVersion.promotion, PromotionVersion.version
+            )
+            for row in rows:
+                promotion = row["promotion"]
+                previous = self.versions.get(promotion, 0)
+                if row["version"] <= previous:
+                    continue
+                self.versions[promotion] = row["version"]
+                if first:
+                    continue
+                weeks = await WeekVersion.select(
+                    WeekVersion.year, WeekVersion.number
+                ).where(
+                    (WeekVersion.promotion == promotion)
+                    & (WeekVersion.version > previous)
+                )
+                self.pending |= {
+                    (promotion, week["year"], week["number"]) for week in weeks
+                }
+
+    def record(self, versions: Dict[str, int]):
+        """
+        Records versions bumped by this process, unless another process bumped
+        the promotion in between.
+        """
+        for promotion, version in versions.items():
+            if self.versions.get(promotion, 0) == version - 1:
+                self.versions[promotion] = version
+
+    async def changed(self) -> Set[Tuple[str, int, int]]:
+        await self.refresh()
+        changed, self.pending = self.pending, set()
+        return changed
+
+    async def version(self, promotion: str) -> int:
+        await self.refresh()
+        return self.versions.get(promotion, 0)
+
+
+promotion_watcher = PromotionWatcher()
+
+
+def daterange(start_date, end_date, inclusive=True, step=1):
+    for n in range(0, (end_date - start_date).days + inclusive, step):
         yield start_date + timedelta(n)
 
 
+def week_key(promotion: str, d: date):
+    year, number, _ = d.isocalendar()
+    return (promotion, year, number)
+
+
+def task_columns(info: Info) -> List[Column]:
+    """
+    Task columns needed for the fields requested below a week (id and date
+    are always needed), leaving out the content for overviews that don't show
+    it.
+    """
+    return project(
+        info, TASK_COLUMNS, keys=[Task.id, Task.date], path=["days", "tasks"]
+    )
+
+
+async def invalidate_changed():
+    """
+    Drops the cached weeks and months changed by other processes since the
+    last call, and notifies the subscribers of these weeks.
+    """
+    changed = await promotion_watcher.changed()
+    if changed:
+        invalidate_weeks(changed)
+        await publish_weeks(changed)
+
+
+async def watch_changes(interval: float):
+    """
+    Checks for changes made by other processes every `interval` seconds while
+    anyone is subscribed, so subscribers are notified of them even when this
+    process doesn't read the weeks.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if not hub.channels:
+            continue
+        try:
+            await invalidate_changed()
+        except Exception:
+            logger.exception("Checking for changed weeks failed")
+
+
+def invalidate_weeks(keys: Set[Tuple[str, int, int]]):
+    week_cache.invalidate_where(lambda key, week: key[:3] in keys)
+    months = set()
+    for promotion, year, number in keys:
+        for weekday in (1, 7):
+            d = date.fromisocalendar(year, number, weekday)
+            months.add((promotion, d.year, d.month))
+    month_cache.invalidate(*months)
+
+
+async def publish_weeks(keys: Set[Tuple[str, int, int]]):
+    for promotion, year, number in keys:
+        if hub.has_subscribers(promotion):
+            monday = date.fromisocalendar(year, number, 1)
+            weeks = await get_weeks(promotion, monday, monday + timedelta(6))
+            hub.publish(promotion, weeks[0])
+
+
+async def get_weeks(
+    promotion: str,
+    monday: date,
+    sunday: date,
+    columns: Optional[Sequence[Column]] = None,
+) -> List[types.Week]:
+    await invalidate_changed()
+
+    # Weeks read with different columns are cached separately, the first
+    # three items of the key are the week_key.
+    names = tuple(column._meta.name for column in (columns or TASK_COLUMNS.values()))
+    keys = [(*week_key(promotion, d), names) for d in daterange(monday, sunday, step=7)]
+    weeks = [week_cache.get(key) for key in keys]
+    if all(weeks):
+        return weeks
+
+    generation = week_cache.generation
+    weeks = await fetch_weeks(promotion, monday, sunday, columns)
+    for key, week in zip(keys, weeks):
+        week_cache.set(key, week, generation)
+    return weeks
+
+
+async def weeks_changed(*keys):
+    changed = set(keys)
+    promotion_watcher.record(await PromotionVersion.bump(*changed))
+    invalidate_weeks(changed)
+    await publish_weeks(changed)
+
+
+async def fetch_weeks(
+    promotion: str,
+    monday: date,
+    sunday: date,
+    columns: Optional[Sequence[Column]] = None,
+) -> List[types.Week]:
+    # Fields whose column isn't read are left empty: they weren't requested.
+    db_tasks = (
+        await Task.select(*(columns or TASK_COLUMNS.values()))
+        .where(
+            (Task.promotion == promotion)
+            & (Task.date >= monday)
+            & (Task.date <= sunday)
+        )
+        .order_by(Task.date, Task.id)
+    )
+    tasks = defaultdict(list)
+    for task in db_tasks:
+        tasks[task["date"]].append(
+            types.Task(
+                id=task["id"],
+                date=task["date"],
+                promotion=promotion,
+                type=task.get("type"),
+                title=task.get("title"),
+                content=task.get("content"),
+                matter_id=task.get("matter_id"),
+            )
+        )
+
+    weeks = []
+    for d in daterange(monday, sunday):
+        if d.weekday() == 0:
+            year, number, _ = d.isocalendar()
+            weeks.append(
+                types.Week(
+                    promotion=promotion,
+                    number=number,
+                    year=year,
+                    date_from=d,
+                    date_to=d + timedelta(4),
+                    days=[],
+                )
+            )
+        weeks[-1].days.append(types.Day(date=d, tasks=tasks.get(d, [])))
+    return weeks
+
+
+async def get_month(promotion: str, year: int, month: int) -> types.MonthOverview:
+    await invalidate_changed()
+
+    key = (promotion, year, month)
+    overview = month_cache.get(key)
+    if overview is None:
+        generation = month_cache.generation
+        overview = await fetch_month(promotion, year, month)
+        month_cache.set(key, overview, generation)
+    return overview
+
+
+async def fetch_month(promotion: str, year: int, month: int) -> types.MonthOverview:
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    rows = (
+        await Task.select(Task.date, Task.type, Count())
+        .where(
+            (Task.promotion == promotion) & (Task.date >= first) & (Task.date <= last)
+        )
+        .group_by(Task.date, Task.type)
+    )
+    counts = defaultdict(dict)
+    for row in rows:
+        counts[row["date"]][row["type"]] = row["count"]
+
+    days = []
+    for d in daterange(first, last):
+        day = counts.get(d, {})
+        days.append(
+            types.DayOverview(
+                date=d,
+                total=sum(day.values()),
+                counts=[
+                    types.TypeCount(type=type, count=day.get(type, 0))
+                    for type in ALLOWED_TYPES
+                ],
+            )
+        )
+    return types.MonthOverview(promotion=promotion, year=year, month=month, days=days)
+
+
 @strawberry.type
 class Query:
     @strawberry.field
     async def matters(self) -> List[types.Matter]:
-        matters = await Matter.select().order_by("name")
+        matters = (await catalog.get()).matters
         return [
             types.Matter(
                 id=matter["id"],
@@ -31,6 +314,7 @@ class Query:
     @strawberry.field
     async def week(
         self,
+        info: Info,
         promotion: str,
         number: Optional[int] = None,
         year: Optional[int] = None,
@@ -40,38 +324,34 @@ class Query:
         if year is None:
             year = date.today().year
         monday = date.fromisocalendar(year, number, 1)
-        friday = date.fromisocalendar(year, number, 5)
         sunday = date.fromisocalendar(year, number, 7)
+        return (await get_weeks(promotion, monday, sunday, task_columns(info)))[0]
 
-        db_tasks = await Task.select().where(
-            (Task.promotion == promotion)
-            & (Task.date >= monday)
-            & (Task.date <= sunday)
-        )
-        days = []
-        for d in daterange(monday, sunday):
-            tasks = [
-                types.Task(
-                    id=task["id"],
-                    date=task["date"],
-                    promotion=task["promotion"],
-                    type=task["type"],
-                    title=task["title"],
-                    content=task["content"],
-                )
-                for task in db_tasks
-                if task["date"] == d
-            ]
-            days.append(types.Day(date=d, tasks=tasks))
+    @strawberry.field
+    async def month_overview(
+        self, promotion: str, year: int, month: int
+    ) -> types.MonthOverview:
+        if not 1 <= month <= 12:
+            raise Exception("Month must be between 1 and 12.")
+        if not 1 <= year <= 9999:
+            raise Exception("Year must be between 1 and 9999.")
+        return await get_month(promotion, year, month)
 
-        return types.Week(
-            promotion=promotion,
-            number=number,
-            year=year,
-            date_from=monday,
-            date_to=friday,
-            days=days,
-        )
+    @strawberry.field
+    async def weeks(
+        self,
+        info: Info,
+        promotion: str,
+        date_from: date,
+        date_to: date,
+    ) -> List[types.Week]:
+        if date_to < date_from:
+            raise Exception("End date must be after start date.")
+        monday = date_from - timedelta(date_from.weekday())
+        sunday = date_to + timedelta(6 - date_to.weekday())
+        if (sunday - monday).days // 7 + 1 > MAX_WEEKS:
+            raise Exception(f"Cannot request more than {MAX_WEEKS} weeks at once.")
+        return await get_weeks(promotion, monday, sunday, task_columns(info))
 
 
 @strawberry.type
@@ -87,20 +367,19 @@ class Mutation:
         content: Optional[str] = "",
         id: Optional[int] = None,
     ) -> types.Task:
-        promotion = promotion.lower()
-        if not re.match("^[a-z0-9]{3,6}$", promotion):
-            raise Exception("Unconventional promotion name provided.")
-
-        allowed_types = ("homework", "test", "info", "summary")
-        if type not in allowed_types:
-            raise Exception("Only allowed types are: " + ", ".join(allowed_types))
-
-        matter_id = await Matter.select(Matter.id).where(Matter.abbr == matter).first()
-        if matter_id is None:
-            raise Exception(f"Matter with code {matter} doesn't exist")
-        matter_id = matter_id["id"]
+        promotion, matter_id = validate_task(
+            promotion, type, matter, (await catalog.get()).by_abbr
+        )
 
+        affected = [week_key(promotion, date)]
         if id:
+            old = (
+                await Task.select(Task.promotion, Task.date)
+                .where(Task.id == id)
+                .first()
+            )
+            if old:
+                affected.append(week_key(old["promotion"], old["date"]))
             await Task.update(
                 {
                     Task.date: date,
@@ -124,6 +403,7 @@ class Mutation:
                     )
                 )
             )[0]["id"]
+        await weeks_changed(*affected)
 
         return types.Task(
             id=id,
@@ -132,9 +412,106 @@ class Mutation:
             type=type,
             title=title,
             content=content,
+            matter_id=matter_id,
         )
 
     @strawberry.mutation(permission_classes=[types.IsAdmin])
     async def delete_task(self, id: int) -> bool:
+        old = await Task.select(Task.promotion, Task.date).where(Task.id == id).first()
         await Task.delete().where(Task.id == id)
+        if old:
+            await weeks_changed(week_key(old["promotion"], old["date"]))
         return True
+
+    @strawberry.mutation(permission_classes=[types.IsAdmin])
+    async def upsert_tasks(self, tasks: List[types.TaskInput]) -> List[types.Task]:
+        if len(tasks) > MAX_UPSERT_TASKS:
+            raise Exception(
+                f"Cannot upsert more than {MAX_UPSERT_TASKS} tasks at once."
+            )
+        matters = (await catalog.get()).by_abbr
+        rows = []
+        for task in tasks:
+            promotion, matter_id = validate_task(
+                task.promotion, task.type, task.matter, matters
+            )
+            row = Task(
+                date=task.date,
+                promotion=promotion,
+                type=task.type,
+                matter_id=matter_id,
+                title=task.title,
+                content=task.content,
+            )
+            if task.id:
+                row.id = task.id
+            rows.append(row)
+
+        ids = [task.id for task in tasks if task.id]
+        if len(ids) != len(set(ids)):
+            raise Exception("The same task can't be updated twice.")
+        created = [row for task, row in zip(tasks, rows) if not task.id]
+        updated = [row for task, row in zip(tasks, rows) if task.id]
+
+        async with Task._meta.db.transaction():
+            old = []
+            if ids:
+                old = await Task.select(Task.id, Task.promotion, Task.date).where(
+                    Task.id.is_in(ids)
+                )
+                missing = set(ids) - {task["id"] for task in old}
+                if missing:
+                    raise Exception(
+                        "Tasks don't exist: " + ", ".join(map(str, sorted(missing)))
+                    )
+                await Task.insert(*updated).on_conflict(
+                    target=Task.id,
+                    action="DO UPDATE",
+                    values=[
+                        Task.date,
+                        Task.promotion,
+                        Task.type,
+                        Task.matter_id,
+                        Task.title,
+                        Task.content,
+                    ],
+                )
+            if created:
+                await Task.insert(*created)
+
+        await weeks_changed(
+            *[week_key(row.promotion, row.date) for row in rows],
+            *[week_key(task["promotion"], task["date"]) for task in old],
+        )
+        return [
+            types.Task(
+                id=row.id,
+                date=row.date,
+                promotion=row.promotion,
+                type=row.type,
+                title=row.title,
+                content=row.content,
+                matter_id=row.matter_id,
+            )
+            for row in rows
+        ]
+
+    @strawberry.mutation(permission_classes=[types.IsAdmin])
+    async def delete_tasks(self, ids: List[int]) -> bool:
+        if not ids:
+            return True
+        async with Task._meta.db.transaction():
+            old = await Task.select(Task.promotion, Task.date).where(Task.id.is_in(ids))
+            await Task.delete().where(Task.id.is_in(ids))
+        await weeks_changed(
+            *[week_key(task["promotion"], task["date"]) for task in old]
+        )
+        return True
+
+
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def week_changed(self, promotion: str) -> AsyncGenerator[types.Week, None]:
+        async for week in hub.subscribe(promotion):
+            yield week
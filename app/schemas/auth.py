@@ -7,7 +7,8 @@ import strawberry
 from dotenv import load_dotenv
 from strawberry.types import Info
 
-from app.models import Profile, User
+from app import passwords
+from app.models import Profile, User, UserVersion
 from app.schemas import types
 
 load_dotenv()
@@ -34,7 +35,7 @@ class Query:
 class Mutation:
     @strawberry.mutation
     async def login(self, email: str, password: str) -> types.AuthResult:
-        user_id = await User.login(username=email, password=password)
+        user_id = await passwords.login(username=email, password=password)
 
         if user_id:
             user = await User.select().where(User.id == user_id).first()
@@ -61,7 +62,7 @@ class Mutation:
         is_public: Optional[bool] = False,
     ) -> types.AuthResult:
         try:
-            user = await User.create_user(
+            user = await passwords.create_user(
                 username=email,
                 email=email,
                 password=password,
@@ -76,6 +77,7 @@ class Mutation:
                     is_public=is_public,
                 )
             )
+            await UserVersion.bump(user["id"])
         except Exception:
             raise Exception("Something went wrong")
 
@@ -0,0 +1,365 @@
+import math
+from collections import Counter
+from inspect import isawaitable
+from time import perf_counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNamedType,
+    GraphQLResolveInfo,
+    GraphQLSchema,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    OperationType,
+    SelectionSetNode,
+    get_named_type,
+    get_nullable_type,
+    value_from_ast_untyped,
+)
+from strawberry.extensions import SchemaExtension
+from strawberry.resolvers import is_default_resolver
+from strawberry.types import ExecutionContext
+
+from app import metrics
+from app.db import query_counter
+from app.ratelimit import TokenBuckets
+
+# Cost of resolving a field once, by "Type.field". Fields with a selection set
+# default to 1 and scalars to 0.
+FIELD_COSTS = {
+    "Query.week": 10,
+    "Query.weeks": 50,
+    "Query.profiles": 5,
+    "Query.matters": 1,
+    "Query.monthOverview": 5,
+    "Mutation.task": 10,
+    "Mutation.upsertTasks": 1,
+}
+
+# List fields returning one item per element of one of their arguments: their
+# own cost and their children's are counted once per element.
+LIST_ARGUMENTS = {
+    "Mutation.upsertTasks": "tasks",
+}
+
+# Expected number of items of list fields, their children cost that many times.
+LIST_SIZES = {
+    "Query.weeks": 20,
+    "Query.profiles": 30,
+    "Query.matters": 15,
+    "Week.days": 7,
+    "MonthOverview.days": 31,
+    "Day.tasks": 5,
+    "User.profiles": 2,
+}
+DEFAULT_LIST_SIZE = 10
+
+
+def argument_length(
+    field: FieldNode, name: str, variables: Optional[Dict[str, Any]]
+) -> int:
+    for argument in field.arguments:
+        if argument.name.value == name:
+            value = value_from_ast_untyped(argument.value, variables)
+            # A single item is coerced to a list of one.
+            return len(value) if isinstance(value, list) else 1
+    return 0
+
+
+def selection_set_cost(
+    schema: GraphQLSchema,
+    parent_type: GraphQLNamedType,
+    selection_set: SelectionSetNode,
+    fragments: Dict[str, FragmentDefinitionNode],
+    variables: Optional[Dict[str, Any]] = None,
+    visited: FrozenSet[str] = frozenset(),
+) -> int:
+    # The document isn't validated yet: unknown fields and fragment cycles
+    # have to be tolerated here, validation will report them.
+    cost = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            if name.startswith("__"):
+                continue
+            field = getattr(parent_type, "fields", {}).get(name)
+            if field is None:
+                cost += 1
+                continue
+            key = f"{parent_type.name}.{name}"
+            field_cost = FIELD_COSTS.get(key, 1 if selection.selection_set else 0)
+            if key in LIST_ARGUMENTS:
+                size = argument_length(selection, LIST_ARGUMENTS[key], variables)
+                field_cost *= size
+            else:
+                size = LIST_SIZES.get(key, DEFAULT_LIST_SIZE)
+            cost += field_cost
+            if selection.selection_set:
+                children = selection_set_cost(
+                    schema,
+                    get_named_type(field.type),
+                    selection.selection_set,
+                    fragments,
+                    variables,
+                    visited,
+                )
+                if isinstance(get_nullable_type(field.type), GraphQLList):
+                    children *= size
+                cost += children
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = fragments.get(name)
+            if fragment is None or name in visited:
+                continue
+            cost += selection_set_cost(
+                schema,
+                schema.get_type(fragment.type_condition.name.value) or parent_type,
+                fragment.selection_set,
+                fragments,
+                variables,
+                visited | {name},
+            )
+        elif isinstance(selection, InlineFragmentNode):
+            type_ = parent_type
+            if selection.type_condition:
+                type_ = schema.get_type(selection.type_condition.name.value) or type_
+            cost += selection_set_cost(
+                schema, type_, selection.selection_set, fragments, variables, visited
+            )
+    return cost
+
+
+def selected_operation(
+    execution_context: ExecutionContext,
+) -> Tuple[Optional[OperationDefinitionNode], Dict[str, FragmentDefinitionNode]]:
+    document = execution_context.graphql_document
+    operations = [
+        definition
+        for definition in document.definitions
+        if isinstance(definition, OperationDefinitionNode)
+    ]
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    name = execution_context.operation_name
+    operation = next(
+        (
+            operation
+            for operation in operations
+            if name is None or (operation.name and operation.name.value == name)
+        ),
+        None,
+    )
+    return operation, fragments
+
+
+def root_fields(
+    selection_set: SelectionSetNode,
+    fragments: Dict[str, FragmentDefinitionNode],
+    visited: FrozenSet[str] = frozenset(),
+) -> Iterator[str]:
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield selection.name.value
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = fragments.get(name)
+            if fragment is not None and name not in visited:
+                yield from root_fields(
+                    fragment.selection_set, fragments, visited | {name}
+                )
+        elif isinstance(selection, InlineFragmentNode):
+            yield from root_fields(selection.selection_set, fragments, visited)
+
+
+class QueryCost(SchemaExtension):
+    """
+    Rejects operations whose estimated cost is over `max_cost` before anything
+    is executed, and reports the cost in the response extensions.
+    """
+
+    def __init__(self, max_cost: int):
+        super().__init__()
+        self.max_cost = max_cost
+        self.cost: Optional[int] = None
+
+    def on_validate(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        schema = execution_context.schema._schema
+        operation, fragments = selected_operation(execution_context)
+        if operation is not None:
+            root_type = {
+                OperationType.QUERY: schema.query_type,
+                OperationType.MUTATION: schema.mutation_type,
+                OperationType.SUBSCRIPTION: schema.subscription_type,
+            }[operation.operation]
+            self.cost = selection_set_cost(
+                schema,
+                root_type,
+                operation.selection_set,
+                fragments,
+                execution_context.variables,
+            )
+            if self.cost > self.max_cost:
+                execution_context.pre_execution_errors = [
+                    *(execution_context.pre_execution_errors or []),
+                    GraphQLError(
+                        f"Query cost {self.cost} exceeds the maximum of "
+                        f"{self.max_cost}."
+                    ),
+                ]
+        yield
+
+    def get_results(self) -> Dict[str, Dict[str, int]]:
+        if self.cost is None:
+            return {}
+        return {"cost": {"requested": self.cost, "maximum": self.max_cost}}
+
+
+class Metrics(SchemaExtension):
+    """
+    Records the duration, database queries and errors of each operation, and
+    the duration of fields with their own resolver, in `app.metrics`.
+    """
+
+    def on_operation(self) -> Iterator[None]:
+        counter = [0]
+        token = query_counter.set(counter)
+        start = perf_counter()
+        # Parse errors are raised through here and only added to the result
+        # afterwards.
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            duration = perf_counter() - start
+            query_counter.reset(token)
+
+            execution_context = self.execution_context
+            operation = metrics.operation_label(execution_context.operation_name)
+            try:
+                operation_type = execution_context.operation_type.value
+            except Exception:
+                operation_type = "invalid"
+            result = execution_context.result
+            errors = (
+                failed
+                or execution_context.pre_execution_errors
+                or (result and result.errors)
+            )
+
+            metrics.operation_duration.observe(duration, operation, operation_type)
+            metrics.operation_queries.observe(counter[0], operation)
+            if errors:
+                metrics.operation_errors.inc(operation)
+
+    def resolve(
+        self, _next: Callable, root: Any, info: GraphQLResolveInfo, *args, **kwargs
+    ) -> Any:
+        # Cheaper than strawberry's should_skip_tracing, which walks the path.
+        field = info.parent_type.fields.get(info.field_name)
+        if (
+            field is None
+            or field.resolve is None
+            or is_default_resolver(field.resolve)
+            or info.parent_type.name.startswith("__")
+            or info.field_name.startswith("__")
+        ):
+            return _next(root, info, *args, **kwargs)
+
+        start = perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        name = f"{info.parent_type.name}.{info.field_name}"
+        if isawaitable(result):
+            return self._observe(result, name, start)
+        metrics.field_duration.observe(perf_counter() - start, name)
+        return result
+
+    async def _observe(self, result: Awaitable, field: str, start: float) -> Any:
+        try:
+            return await result
+        finally:
+            metrics.field_duration.observe(perf_counter() - start, field)
+
+
+class RateLimit(SchemaExtension):
+    """
+    Rejects operations before anything is executed when one of their root
+    fields is over its limit in `buckets`, by field name. Every occurrence of
+    the field (with aliases) takes a token from the bucket of the user, or of
+    the client address for anonymous requests. `*` limits operations as a
+    whole, whatever their fields.
+    """
+
+    def __init__(self, buckets: Dict[str, TokenBuckets]):
+        super().__init__()
+        self.buckets = buckets
+
+    def on_validate(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        # Operations already rejected (by validation or QueryCost, which come
+        # first) don't count.
+        if not self.buckets or execution_context.pre_execution_errors:
+            yield
+            return
+        operation, fragments = selected_operation(execution_context)
+        if operation is not None:
+            fields = Counter(root_fields(operation.selection_set, fragments))
+            fields["*"] = 1
+            key = self.client_key(execution_context.context)
+            for field, count in fields.items():
+                buckets = self.buckets.get(field)
+                if buckets is None:
+                    continue
+                retry_after = buckets.take(key, count)
+                if retry_after:
+                    self.reject(field, buckets, retry_after)
+                    break
+        yield
+
+    @staticmethod
+    def client_key(context: Any) -> Tuple[str, Any]:
+        user = context.get("user")
+        if user is not None:
+            return ("user", user.id)
+        request = context.get("request")
+        client = request and request.client
+        return ("address", client.host if client else None)
+
+    def reject(self, field: str, buckets: TokenBuckets, retry_after: float):
+        metrics.rate_limited.inc(field)
+        execution_context = self.execution_context
+        if retry_after == math.inf:
+            message = f"{field} is allowed at most {buckets.capacity} times at once."
+            extensions = {"code": "RATE_LIMITED"}
+        else:
+            retry_after = math.ceil(retry_after)
+            message = f"Too many requests, retry in {retry_after} seconds."
+            extensions = {"code": "RATE_LIMITED", "retryAfter": retry_after}
+        execution_context.pre_execution_errors = [
+            *(execution_context.pre_execution_errors or []),
+            GraphQLError(message, extensions=extensions),
+        ]
+
+        response = execution_context.context.get("response")
+        if response is not None:
+            response.status_code = 429
+            if "retryAfter" in extensions:
+                response.headers["Retry-After"] = str(extensions["retryAfter"])
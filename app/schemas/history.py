@@ -0,0 +1,96 @@
+from datetime import date
+from typing import Optional, Tuple
+
+import strawberry
+from piccolo.columns.combination import WhereRaw
+
+from app.catalog import catalog
+from app.models import Task
+from app.schemas import types
+from app.schemas.pagination import decode_cursor, encode_cursor
+from app.validation import ALLOWED_TYPES
+
+MAX_PAGE_SIZE = 100
+
+
+def decode_task_cursor(cursor: str) -> Tuple[date, int]:
+    values = decode_cursor(cursor)
+    try:
+        day, id = values
+        return date.fromisoformat(day), int(id)
+    except (TypeError, ValueError):
+        raise Exception("Invalid cursor.") from None
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    async def tasks(
+        self,
+        promotion: str,
+        matter: Optional[str] = None,
+        type: Optional[str] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        first: int = 20,
+    ) -> types.TaskConnection:
+        """
+        Tasks of a promotion, most recent first. Pages are read by seeking to
+        the cursor's (date, id) in an index, so they cost the same however
+        far they are.
+        """
+        if not 0 < first <= MAX_PAGE_SIZE:
+            raise Exception(f"First must be between 1 and {MAX_PAGE_SIZE}.")
+
+        where = Task.promotion == promotion.lower()
+        if matter is not None:
+            matters = (await catalog.get()).by_abbr
+            if matter not in matters:
+                raise Exception(f"Matter with code {matter} doesn't exist")
+            where &= Task.matter_id == matters[matter]["id"]
+        if type is not None:
+            if type not in ALLOWED_TYPES:
+                raise Exception("Only allowed types are: " + ", ".join(ALLOWED_TYPES))
+            where &= Task.type == type
+        if after:
+            where &= WhereRaw("(date, id) < ({}, {})", *decode_task_cursor(after))
+        if before:
+            where &= WhereRaw("(date, id) > ({}, {})", *decode_task_cursor(before))
+
+        rows = (
+            await Task.select(
+                Task.id,
+                Task.date,
+                Task.promotion,
+                Task.type,
+                Task.title,
+                Task.content,
+                Task.matter_id,
+            )
+            .where(where)
+            .order_by(Task.date, Task.id, ascending=False)
+            .limit(first + 1)
+        )
+
+        edges = [
+            types.TaskEdge(
+                cursor=encode_cursor(task["date"].isoformat(), task["id"]),
+                node=types.Task(
+                    id=task["id"],
+                    date=task["date"],
+                    promotion=task["promotion"],
+                    type=task["type"],
+                    title=task["title"],
+                    content=task["content"],
+                    matter_id=task["matter_id"],
+                ),
+            )
+            for task in rows[:first]
+        ]
+        return types.TaskConnection(
+            edges=edges,
+            page_info=types.PageInfo(
+                has_next_page=len(rows) > first,
+                end_cursor=edges[-1].cursor if edges else None,
+            ),
+        )
@@ -0,0 +1,91 @@
+import hashlib
+import json
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set
+
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    GraphQLError,
+    OperationType,
+    get_operation_ast,
+    parse,
+    value_from_ast_untyped,
+)
+
+from app.catalog import catalog
+from app.schemas.agenda import promotion_watcher
+
+# Root fields whose result is the same for everyone and only depends on the
+# tasks of their `promotion` argument and on the matters. `searchTasks` isn't
+# one: its ranking depends on the tasks of every promotion.
+PUBLIC_FIELDS = {"matters", "week", "weeks", "tasks", "monthOverview"}
+
+
+@lru_cache(maxsize=1024)
+def parse_query(query: str) -> Optional[DocumentNode]:
+    try:
+        return parse(query)
+    except GraphQLError:
+        return None
+
+
+def public_promotions(
+    query: str, operation_name: Optional[str], variables: Optional[Dict[str, Any]]
+) -> Optional[Set[str]]:
+    """
+    Promotions whose tasks the operation reads, or None if its response can't
+    be shared between clients.
+    """
+    document = parse_query(query)
+    if document is None:
+        return None
+    operation = get_operation_ast(document, operation_name)
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+
+    promotions = set()
+    for selection in operation.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return None
+        if selection.name.value == "__typename":
+            continue
+        if selection.name.value not in PUBLIC_FIELDS:
+            return None
+        for argument in selection.arguments:
+            if argument.name.value == "promotion":
+                promotion = value_from_ast_untyped(argument.value, variables)
+                if not isinstance(promotion, str):
+                    return None
+                promotions.add(promotion.lower())
+    return promotions
+
+
+async def compute_etag(
+    query: str,
+    operation_name: Optional[str],
+    variables: Optional[Dict[str, Any]],
+    promotions: Set[str],
+) -> str:
+    """
+    Strong ETag of a public query's response: it changes whenever the query,
+    the tasks of its promotions or the matters change, and every day since
+    `week` defaults to the current one.
+    """
+    versions = [
+        (promotion, await promotion_watcher.version(promotion))
+        for promotion in sorted(promotions)
+    ]
+    key = json.dumps(
+        [
+            query,
+            operation_name,
+            variables,
+            versions,
+            (await catalog.get()).digest,
+            date.today().isoformat(),
+        ],
+        sort_keys=True,
+    )
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional
+
+from strawberry.dataloader import DataLoader
+
+from app.catalog import catalog
+from app.models import Profile
+from app.schemas import types
+from app.schemas.projection import USER_COLUMNS
+
+
+async def load_matters(ids: List[int]) -> List[Optional[types.Matter]]:
+    matters = (await catalog.get()).by_id
+    return [
+        types.Matter(
+            id=matter["id"],
+            abbr=matter["abbr"],
+            name=matter["name"],
+            short_name=matter["short_name"],
+        )
+        if (matter := matters.get(id))
+        else None
+        for id in ids
+    ]
+
+
+async def load_profile_users(ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+    profiles = await Profile.select(
+        Profile.id,
+        *[
+            getattr(Profile.user_id, column._meta.name)
+            for column in USER_COLUMNS.values()
+        ],
+    ).where(Profile.id.is_in(ids))
+    users = {
+        profile["id"]: {
+            "id": profile["user_id.id"],
+            "first_name": profile["user_id.first_name"],
+            "last_name": profile["user_id.last_name"],
+            "email": profile["user_id.email"],
+            "admin": profile["user_id.admin"],
+        }
+        for profile in profiles
+        if profile["user_id.id"]
+    }
+    return [users.get(id) for id in ids]
+
+
+async def load_user_profiles(ids: List[int]) -> List[List[types.Profile]]:
+    profiles = await Profile.select().where(Profile.user_id.is_in(ids))
+    users = {id: [] for id in ids}
+    for profile in profiles:
+        users[profile["user_id"]].append(
+            types.Profile(
+                id=profile["id"],
+                promotion=profile["promotion"],
+                is_public=profile["is_public"],
+            )
+        )
+    return [users[id] for id in ids]
+
+
+def create_loaders():
+    return {
+        "matter_loader": DataLoader(load_fn=load_matters),
+        "profile_user_loader": DataLoader(load_fn=load_profile_users),
+        "user_profiles_loader": DataLoader(load_fn=load_user_profiles),
+    }
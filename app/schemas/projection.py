@@ -0,0 +1,72 @@
+from typing import Dict, Iterable, List, Sequence, Set
+
+from piccolo.columns import Column
+from strawberry.types import Info
+from strawberry.types.nodes import SelectedField, Selection
+
+from app.models import Profile, Task, User
+
+# GraphQL fields of the types built from rows, and the column each is read from.
+TASK_COLUMNS = {
+    "id": Task.id,
+    "date": Task.date,
+    "promotion": Task.promotion,
+    "type": Task.type,
+    "title": Task.title,
+    "content": Task.content,
+    "matter": Task.matter_id,
+}
+PROFILE_COLUMNS = {
+    "id": Profile.id,
+    "promotion": Profile.promotion,
+    "isPublic": Profile.is_public,
+}
+USER_COLUMNS = {
+    "id": User.id,
+    "firstName": User.first_name,
+    "lastName": User.last_name,
+    "email": User.email,
+    "admin": User.admin,
+}
+
+
+def selected_names(
+    selections: Iterable[Selection], path: Sequence[str] = ()
+) -> Set[str]:
+    """
+    Names of the fields selected at `path` (field names) below `selections`,
+    through fragments.
+    """
+    names = set()
+    for selection in selections:
+        if not isinstance(selection, SelectedField):
+            names |= selected_names(selection.selections, path)
+        elif not path:
+            names.add(selection.name)
+        elif selection.name == path[0]:
+            names |= selected_names(selection.selections, path[1:])
+    return names
+
+
+def project(
+    info: Info,
+    columns: Dict[str, Column],
+    keys: Sequence[Column] = (),
+    path: Sequence[str] = (),
+) -> List[Column]:
+    """
+    Columns to select for the fields requested at `path` below the current
+    field, `keys` first. Fields missing from `columns` are ignored.
+    """
+    names = selected_names(
+        [selection for field in info.selected_fields for selection in field.selections],
+        path,
+    )
+    projected = list(keys)
+    # Columns overload ==, compare their names instead.
+    seen = {column._meta.name for column in projected}
+    for name, column in columns.items():
+        if name in names and column._meta.name not in seen:
+            projected.append(column)
+            seen.add(column._meta.name)
+    return projected
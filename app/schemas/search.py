@@ -0,0 +1,87 @@
+import re
+from typing import Optional
+
+import strawberry
+
+from app.models import Task
+from app.schemas import types
+from app.schemas.pagination import decode_cursor, encode_cursor
+
+MAX_SEARCH_RESULTS = 50
+
+# bm25 weights of the task_search columns: promotion, title, content.
+RANKING = "bm25(task_search, 0.0, 10.0, 1.0)"
+
+
+def quote(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def match_expression(promotion: str, query: str) -> Optional[str]:
+    """
+    Builds an FTS5 query matching tasks of the promotion with every word of
+    `query` (or a word starting with it) in their title or content. The user
+    input is only used as quoted strings, so it can't be an FTS5 syntax error.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = " AND ".join(f"{quote(word)}*" for word in words)
+    return f"promotion : {quote(promotion.lower())} AND {{title content}} : ({terms})"
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    async def search_tasks(
+        self,
+        promotion: str,
+        query: str,
+        limit: int = 20,
+        after: Optional[str] = None,
+    ) -> types.TaskConnection:
+        if not 0 < limit <= MAX_SEARCH_RESULTS:
+            raise Exception(f"Limit must be between 1 and {MAX_SEARCH_RESULTS}.")
+        offset = 0
+        if after:
+            values = decode_cursor(after)
+            if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+                raise Exception("Invalid cursor.")
+            (offset,) = values
+
+        expression = match_expression(promotion, query)
+        rows = []
+        if expression:
+            rows = await Task.raw(
+                "SELECT task.id, task.date, task.promotion, task.type, task.title, "
+                "task.content, task.matter_id "
+                "FROM task_search JOIN task ON task.id = task_search.rowid "
+                f"WHERE task_search MATCH {{}} ORDER BY {RANKING}, task.id "
+                "LIMIT {} OFFSET {}",
+                expression,
+                limit + 1,
+                offset,
+            )
+
+        edges = [
+            types.TaskEdge(
+                cursor=encode_cursor(offset + index + 1),
+                node=types.Task(
+                    id=task["id"],
+                    date=task["date"],
+                    promotion=task["promotion"],
+                    type=task["type"],
+                    title=task["title"],
+                    content=task["content"],
+                    matter_id=task["matter_id"],
+                ),
+            )
+            for index, task in enumerate(rows[:limit])
+        ]
+        return types.TaskConnection(
+            edges=edges,
+            page_info=types.PageInfo(
+                has_next_page=len(rows) > limit,
+                end_cursor=edges[-1].cursor if edges else None,
+            ),
+        )
@@ -6,8 +6,6 @@ import strawberry
 from strawberry.permission import BasePermission
 from strawberry.types import Info
 
-from app import models
-
 
 @strawberry.type
 class User:
@@ -18,18 +16,8 @@ class User:
     admin: bool
 
     @strawberry.field
-    async def profiles(self) -> List["Profile"]:
-        profiles = await models.Profile.select().where(
-            models.Profile.user_id == self.id
-        )
-        return [
-            Profile(
-                id=profile["id"],
-                promotion=profile["promotion"],
-                is_public=profile["is_public"],
-            )
-            for profile in profiles
-        ]
+    async def profiles(self, info: Info) -> List["Profile"]:
+        return await info.context["user_profiles_loader"].load(self.id)
 
 
 @strawberry.type
@@ -42,24 +30,16 @@ class Profile:
     async def user(self, info: Info) -> Optional["User"]:
         my_id = getattr(info.context.get("user", None), "id", None)
 
-        profile = (
-            await models.Profile.select(models.Profile.user_id.all_columns())
-            .where(models.Profile.id == self.id)
-            .first()
-        )
+        user = await info.context["profile_user_loader"].load(self.id)
         return (
             User(
-                id=profile["user_id.id"],
-                first_name=profile["user_id.first_name"],
-                last_name=profile["user_id.last_name"],
-                email=profile["user_id.email"]
-                if profile["user_id.id"] == my_id
-                else "",
-                admin=profile["user_id.admin"]
-                if profile["user_id.id"] == my_id
-                else False,
+                id=user["id"],
+                first_name=user["first_name"],
+                last_name=user["last_name"],
+                email=user["email"] if user["id"] == my_id else "",
+                admin=user["admin"] if user["id"] == my_id else False,
             )
-            if profile["user_id.id"]
+            if user
             else None
         )
 
@@ -80,24 +60,42 @@ class Task:
     type: str
     title: str
     content: str
+    matter_id: strawberry.Private[Optional[int]]
 
     @strawberry.field
-    async def matter(self) -> Optional["Matter"]:
-        task = (
-            await models.Task.select(models.Task.matter_id.all_columns())
-            .where(models.Task.id == self.id)
-            .first()
-        )
-        return (
-            Matter(
-                id=task["matter_id.id"],
-                abbr=task["matter_id.abbr"],
-                name=task["matter_id.name"],
-                short_name=task["matter_id.short_name"],
-            )
-            if task["matter_id.id"]
-            else None
-        )
+    async def matter(self, info: Info) -> Optional["Matter"]:
+        if self.matter_id is None:
+            return None
+        return await info.context["matter_loader"].load(self.matter_id)
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str]
+
+
+@strawberry.type
+class TaskEdge:
+    cursor: str
+    node: Task
+
+
+@strawberry.type
+class TaskConnection:
+    edges: List[TaskEdge]
+    page_info: PageInfo
+
+
+@strawberry.input
+class TaskInput:
+    date: date
+    promotion: str
+    type: str
+    matter: str
+    title: str
+    content: Optional[str] = ""
+    id: Optional[int] = None
 
 
 @strawberry.type
@@ -122,6 +120,27 @@ class Day:
     tasks: List["Task"]
 
 
+@strawberry.type
+class TypeCount:
+    type: str
+    count: int
+
+
+@strawberry.type
+class DayOverview:
+    date: date
+    total: int
+    counts: List[TypeCount]
+
+
+@strawberry.type
+class MonthOverview:
+    promotion: str
+    year: int
+    month: int
+    days: List[DayOverview]
+
+
 class IsAuthenticated(BasePermission):
     message = "User is not authenticated"
 
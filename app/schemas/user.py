@@ -1,23 +1,25 @@
 from typing import List
 
 import strawberry
+from strawberry.types import Info
 
 from app.models import Profile
 from app.schemas import types
+from app.schemas.projection import PROFILE_COLUMNS, project
 
 
 @strawberry.type
 class Query:
     @strawberry.field(permission_classes=[types.IsAuthenticated])
-    async def profiles(self, promotion: str) -> List[types.Profile]:
-        profiles = await Profile.select().where(
-            (Profile.promotion == promotion) & (Profile.is_public.eq(True))
-        )
+    async def profiles(self, info: Info, promotion: str) -> List[types.Profile]:
+        profiles = await Profile.select(
+            *project(info, PROFILE_COLUMNS, keys=[Profile.id])
+        ).where((Profile.promotion == promotion) & (Profile.is_public.eq(True)))
         return [
             types.Profile(
                 id=profile["id"],
-                promotion=profile["promotion"],
-                is_public=profile["is_public"],
+                promotion=profile.get("promotion"),
+                is_public=profile.get("is_public"),
             )
             for profile in profiles
         ]
@@ -0,0 +1,26 @@
+import re
+from typing import Any, Dict, Tuple
+
+from app.models import Task
+
+ALLOWED_TYPES = tuple(type.value for type in Task.Type)
+
+
+def validate_task(
+    promotion: str, type: str, matter: str, matters: Dict[str, Dict[str, Any]]
+) -> Tuple[str, int]:
+    """
+    Checks a task the same way wherever it comes from, `matters` maps abbrs to
+    matter rows. Returns the normalized promotion and the matter id.
+    """
+    promotion = promotion.lower()
+    if not re.match("^[a-z0-9]{3,6}$", promotion):
+        raise Exception("Unconventional promotion name provided.")
+
+    if type not in ALLOWED_TYPES:
+        raise Exception("Only allowed types are: " + ", ".join(ALLOWED_TYPES))
+
+    if matter not in matters:
+        raise Exception(f"Matter with code {matter} doesn't exist")
+
+    return promotion, matters[matter]["id"]
@@ -0,0 +1,379 @@
+"""
+Seeds a temporary database with a synthetic dataset, runs the app in-process
+and measures the GraphQL hot paths.
+
+    poetry run python -m benchmarks --output before.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+WORKLOADS = {
+    "week": (
+        """query ($promotion: String!) {
+            week(promotion: $promotion) {
+                days { date tasks { id title type content matter { abbr name } } }
+            }
+        }""",
+        lambda ctx: {"promotion": ctx.rng.choice(ctx.promotions)},
+        None,
+    ),
+    "search": (
+        """query ($promotion: String!, $query: String!) {
+            searchTasks(promotion: $promotion, query: $query) {
+                edges { node { id date title } }
+            }
+        }""",
+        # Seeded titles are "Task <n> of <date>", so this matches a large part
+        # of the promotion's tasks, all of which get ranked.
+        lambda ctx: {
+            "promotion": ctx.rng.choice(ctx.promotions),
+            "query": f"task {ctx.rng.randrange(4)}",
+        },
+        None,
+    ),
+    "matters": ("{ matters { id abbr name shortName } }", lambda ctx: {}, None),
+    "profiles": (
+        """query ($promotion: String!) {
+            profiles(promotion: $promotion) { id user { firstName lastName } }
+        }""",
+        lambda ctx: {"promotion": ctx.rng.choice(ctx.promotions)},
+        "user",
+    ),
+    "me": ("{ me { id email firstName } }", lambda ctx: {}, "user"),
+    "login": (
+        """mutation ($email: String!, $password: String!) {
+            login(email: $email, password: $password) { token }
+        }""",
+        lambda ctx: {
+            "email": f"user{ctx.rng.randrange(ctx.users)}@benchmark.local",
+            "password": ctx.password,
+        },
+        None,
+    ),
+    "task": (
+        """mutation ($promotion: String!, $date: Date!) {
+            task(date: $date, promotion: $promotion, type: "homework",
+                 matter: "fran", title: "Benchmark", content: "Benchmark") { id }
+        }""",
+        lambda ctx: {
+            "promotion": ctx.rng.choice(ctx.promotions),
+            "date": date.today().isoformat(),
+        },
+        "admin",
+    ),
+}
+
+# Measures the first workload while the second one runs alongside, e.g. reads
+# during a burst of logins hashing passwords.
+MIXED_WORKLOADS = {"week_during_logins": ("week", "login")}
+
+
+class Context:
+    def __init__(self, rng, promotions, days, users, password, tokens):
+        self.rng = rng
+        self.promotions = promotions
+        self.days = days
+        self.users = users
+        self.password = password
+        self.tokens = tokens
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1] * 1000, 3)
+
+
+async def run_workload(client, ctx, name, requests, concurrency):
+    query, variables, token = WORKLOADS[name]
+    token = ctx.tokens.get(token)
+    latencies = []
+    errors = 0
+    sent = 0
+    size = 0
+
+    async def worker():
+        nonlocal errors, sent, size
+        while sent < requests:
+            sent += 1
+            start = time.perf_counter()
+            status, response, length = await client.graphql(
+                query, variables(ctx), token
+            )
+            latencies.append(time.perf_counter() - start)
+            size += length
+            if status != 200 or response.get("errors"):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "throughput": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "bytes_per_response": round(size / len(latencies)),
+    }
+
+
+async def measure_week_projection(client, ctx, requests):
+    """
+    Compares fetching weeks with every task column and with only the ones an
+    overview asking for titles needs: bytes of text read from the database,
+    memory allocated (tracemalloc peak) and latency.
+    """
+    from app.models import Task
+    from app.schemas.agenda import fetch_weeks
+
+    variants = {
+        "all_columns": None,
+        "titles_only": [Task.id, Task.date, Task.title],
+    }
+    first, last = ctx.days
+    first_monday = first - timedelta(first.weekday())
+    mondays = [
+        first_monday + timedelta(7 * n)
+        for n in range((last - first_monday).days // 7 + 1)
+    ]
+    results = {}
+    for name, columns in variants.items():
+        weeks = [
+            (ctx.rng.choice(ctx.promotions), ctx.rng.choice(mondays))
+            for _ in range(requests)
+        ]
+        latencies = []
+        size = 0
+        for promotion, monday in weeks:
+            start = time.perf_counter()
+            result = await fetch_weeks(
+                promotion, monday, monday + timedelta(6), columns
+            )
+            latencies.append(time.perf_counter() - start)
+            size += sum(
+                len(task.title or "") + len(task.content or "")
+                for day in result[0].days
+                for task in day.tasks
+            )
+
+        tracemalloc.start()
+        peaks = []
+        for promotion, monday in weeks[:100]:
+            tracemalloc.reset_peak()
+            await fetch_weeks(promotion, monday, monday + timedelta(6), columns)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        results[name] = {
+            "requests": requests,
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+            "text_bytes_per_week": round(size / requests),
+            "peak_allocated_bytes": round(statistics.fmean(peaks)),
+        }
+    return results
+
+
+ENCODED_PAYLOADS = {
+    "week": (WORKLOADS["week"][0], lambda ctx: {"promotion": ctx.promotions[0]}),
+    "semester": (
+        """query ($promotion: String!, $dateFrom: Date!, $dateTo: Date!) {
+            weeks(promotion: $promotion, dateFrom: $dateFrom, dateTo: $dateTo) {
+                days { date tasks { id title type content matter { abbr name } } }
+            }
+        }""",
+        lambda ctx: {
+            "promotion": ctx.promotions[0],
+            "dateFrom": (ctx.days[1] - timedelta(140)).isoformat(),
+            "dateTo": ctx.days[1].isoformat(),
+        },
+    ),
+    "matters": (WORKLOADS["matters"][0], lambda ctx: {}),
+}
+
+
+async def measure_encoding(client, ctx, requests):
+    """
+    Encode time of typical responses with json and orjson, and their size on
+    the wire uncompressed, gzipped and (if installed) brotli compressed.
+    """
+    import gzip
+
+    from app.compression import brotli
+    from app.main import BROTLI_QUALITY, GZIP_LEVEL
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    def encode_time(encode, payload):
+        start = time.perf_counter()
+        for _ in range(requests):
+            encode(payload)
+        return round((time.perf_counter() - start) / requests * 1e6, 1)
+
+    results = {}
+    for name, (query, variables) in ENCODED_PAYLOADS.items():
+        _, payload, _ = await client.graphql(query, variables(ctx))
+        body = json.dumps(payload).encode()
+        result = {
+            "json_us": encode_time(json.dumps, payload),
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, compresslevel=GZIP_LEVEL)),
+        }
+        if orjson is not None:
+            result["orjson_us"] = encode_time(orjson.dumps, payload)
+        if brotli is not None:
+            result["brotli_bytes"] = len(brotli.compress(body, quality=BROTLI_QUALITY))
+        results[name] = result
+    return results
+
+
+# Measure a single piece of the app directly, rather than through HTTP.
+MEASUREMENTS = {
+    "week_projection": measure_week_projection,
+    "encoding": measure_encoding,
+}
+
+
+async def benchmark(args):
+    # Imported here, the database path must be set beforehand.
+    from piccolo.apps.migrations.commands.forwards import run_forwards
+
+    from app.main import app
+    from app.schemas.auth import create_token
+    from benchmarks.client import ASGIClient
+    from benchmarks.seed import PASSWORD, seed
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for app_name in ("user", "app"):
+            result = await run_forwards(app_name)
+            if not result.success:
+                raise Exception(result.message)
+
+    start = time.perf_counter()
+    dataset = await seed(
+        promotions=args.promotions,
+        years=args.years,
+        tasks_per_day=args.tasks_per_day,
+        users=args.users,
+        content_size=args.content_size,
+        random_seed=args.seed,
+    )
+    print(
+        f"Seeded {dataset['tasks']} tasks and {dataset['users']} users "
+        f"in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+
+    ctx = Context(
+        rng=random.Random(args.seed),
+        promotions=dataset["promotions"],
+        days=dataset["days"],
+        users=dataset["users"],
+        password=PASSWORD,
+        tokens={
+            "admin": create_token(dataset["admin_id"]),
+            "user": create_token(dataset["admin_id"] + 1),
+        },
+    )
+    client = ASGIClient(app)
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name in args.workloads:
+            if name in MEASUREMENTS:
+                results[name] = await MEASUREMENTS[name](client, ctx, args.requests)
+                print(f"{name:>10}: {json.dumps(results[name])}", file=sys.stderr)
+                continue
+            if name in MIXED_WORKLOADS:
+                reads, background = MIXED_WORKLOADS[name]
+                await run_workload(client, ctx, reads, args.warmup, args.concurrency)
+                results[name], _ = await asyncio.gather(
+                    run_workload(client, ctx, reads, args.requests, args.concurrency),
+                    run_workload(
+                        client, ctx, background, args.login_requests, args.concurrency
+                    ),
+                )
+            else:
+                requests = args.login_requests if name == "login" else args.requests
+                await run_workload(client, ctx, name, args.warmup, args.concurrency)
+                results[name] = await run_workload(
+                    client, ctx, name, requests, args.concurrency
+                )
+            print(
+                f"{name:>10}: {results[name]['throughput']:>8} req/s  "
+                f"p50 {results[name]['p50_ms']:>8} ms  "
+                f"p95 {results[name]['p95_ms']:>8} ms  "
+                f"p99 {results[name]['p99_ms']:>8} ms  "
+                f"errors {results[name]['errors']}",
+                file=sys.stderr,
+            )
+
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "dataset": {"tasks": dataset["tasks"], "users": dataset["users"]},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--promotions", type=int, default=8)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--tasks-per-day", type=int, default=2)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--content-size", type=int, default=400)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workloads",
+        nargs="+",
+        choices=[*WORKLOADS, *MIXED_WORKLOADS, *MEASUREMENTS],
+        default=[*WORKLOADS, *MIXED_WORKLOADS, *MEASUREMENTS],
+    )
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["SQLITE_PATH"] = os.path.join(directory, "benchmark.db")
+        if len(os.environ.get("JWT_SECRET", "")) < 31:
+            os.environ["JWT_SECRET"] = secrets.token_hex(32)
+        # Every request comes from the same client, they would mostly measure
+        # rejections.
+        os.environ.setdefault("RATE_LIMITS", "")
+        report = asyncio.run(benchmark(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
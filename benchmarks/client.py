@@ -0,0 +1,80 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+
+class ASGIClient:
+    """
+    Minimal HTTP client calling an ASGI app directly, so requests go through
+    the whole middleware and routing stack without any network.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+        query_string: bytes = b"",
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string,
+            "root_path": "",
+            "headers": [
+                (key.lower().encode(), value.encode())
+                for key, value in (headers or {}).items()
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+        status = 0
+        response_headers = {}
+        chunks = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update(
+                    (key.decode(), value.decode()) for key, value in message["headers"]
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        return status, response_headers, b"".join(chunks)
+
+    async def graphql(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        token: Optional[str] = None,
+    ) -> Tuple[int, Dict[str, Any], int]:
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = token
+        body = json.dumps({"query": query, "variables": variables or {}}).encode()
+        status, _, content = await self.request("POST", "/graphql", body, headers)
+        return status, json.loads(content), len(content)
@@ -0,0 +1,101 @@
+import random
+import secrets
+from datetime import date, timedelta
+
+from app.data import DEFAULT_MATTERS
+from app.models import Matter, Profile, PromotionVersion, Task, User
+
+PASSWORD = "benchmark"
+TYPES = [type.value for type in Task.Type]
+BATCH_SIZE = 1000
+
+
+def school_days(start: date, end: date):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(1)
+
+
+async def insert_batches(table, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        await table.insert(*rows[i : i + BATCH_SIZE])
+
+
+async def seed(
+    promotions: int,
+    years: int,
+    tasks_per_day: int,
+    users: int,
+    content_size: int,
+    random_seed: int = 0,
+):
+    """
+    Fills an empty, migrated database with a synthetic dataset. Every user has
+    the same password, the first one is admin.
+    """
+    rng = random.Random(random_seed)
+    promotion_names = [f"bch{i}" for i in range(promotions)]
+
+    await Matter.insert(*[Matter(**matter.to_dict()) for matter in DEFAULT_MATTERS])
+    matter_ids = [matter["id"] for matter in await Matter.select(Matter.id)]
+
+    today = date.today()
+    days = list(school_days(today - timedelta(365 * years), today + timedelta(60)))
+    tasks = [
+        Task(
+            date=day,
+            promotion=promotion,
+            type=rng.choice(TYPES),
+            matter_id=rng.choice(matter_ids),
+            title=f"Task {n} of {day}",
+            content=secrets.token_hex(content_size // 2),
+        )
+        for promotion in promotion_names
+        for day in days
+        for n in range(rng.randint(0, tasks_per_day * 2))
+    ]
+
+    # Hashing is slow on purpose, so it's only done once.
+    password = User.hash_password(PASSWORD)
+    user_rows = [
+        User(
+            username=f"user{i}@benchmark.local",
+            email=f"user{i}@benchmark.local",
+            password=password,
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            active=True,
+            admin=i == 0,
+        )
+        for i in range(users)
+    ]
+
+    async with Task._meta.db.transaction():
+        await insert_batches(Task, tasks)
+        # Insert users without Piccolo's password hashing.
+        await insert_batches(User, user_rows)
+        user_ids = [user["id"] for user in await User.select(User.id)]
+        await insert_batches(
+            Profile,
+            [
+                Profile(
+                    user_id=user_id,
+                    promotion=promotion_names[i % promotions],
+                    is_public=rng.random() < 0.8,
+                )
+                for i, user_id in enumerate(user_ids)
+            ],
+        )
+        await PromotionVersion.bump(
+            *{(task.promotion, *task.date.isocalendar()[:2]) for task in tasks}
+        )
+
+    return {
+        "promotions": promotion_names,
+        "tasks": len(tasks),
+        "users": len(user_ids),
+        "admin_id": user_ids[0],
+        "days": (days[0], days[-1]),
+    }
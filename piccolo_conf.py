@@ -2,10 +2,19 @@ import os
 
 from dotenv import load_dotenv
 from piccolo.conf.apps import AppRegistry
-from piccolo.engine.sqlite import SQLiteEngine
+
+from app.db import PooledSQLiteEngine
 
 load_dotenv()
 
 SQLITE_PATH = os.environ.get("SQLITE_PATH")
 APP_REGISTRY = AppRegistry(apps=["app.piccolo_app", "piccolo.apps.user.piccolo_app"])
-DB = SQLiteEngine(path=SQLITE_PATH)
+DB = PooledSQLiteEngine(
+    path=SQLITE_PATH,
+    journal_mode=os.environ.get("SQLITE_JOURNAL_MODE", "wal"),
+    synchronous=os.environ.get("SQLITE_SYNCHRONOUS", "normal"),
+    busy_timeout=int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+    mmap_size=int(os.environ.get("SQLITE_MMAP_SIZE", 0)),
+    cache_size=int(os.environ.get("SQLITE_CACHE_SIZE", -2000)),
+    read_pool_size=int(os.environ.get("SQLITE_READ_POOL_SIZE", 4)),
+)
@@ -0,0 +1,24 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# piccolo_conf and app.schemas.auth read them when they're first imported.
+DIRECTORY = tempfile.mkdtemp()
+os.environ["SQLITE_PATH"] = os.path.join(DIRECTORY, "test.db")
+os.environ["PICCOLO_CONF"] = "piccolo_conf"
+os.environ["JWT_SECRET"] = "test" * 8
+
+from piccolo.apps.migrations.commands.forwards import run_forwards  # noqa: E402
+from piccolo.utils.sync import run_sync  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database() -> str:
+    """
+    Path of a database migrated once for the whole session.
+    """
+    run_sync(run_forwards("all"))
+    yield os.environ["SQLITE_PATH"]
+    shutil.rmtree(DIRECTORY)
@@ -0,0 +1,32 @@
+import asyncio
+import sqlite3
+
+from piccolo.engine import engine_finder
+
+from app.models import Task
+
+
+async def read_during_write(database: str):
+    engine = engine_finder()
+    await engine.start_connection_pool()
+    # Another connection, like the CLI or another worker, holding the write
+    # lock with a task it hasn't committed yet.
+    writer = sqlite3.connect(database, isolation_level=None)
+    try:
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute(
+            "INSERT INTO task (date, promotion, type, title, content) "
+            "VALUES ('2026-10-19', 'cin1a', 'test', 'uncommitted', '')"
+        )
+        return await asyncio.wait_for(
+            Task.select(Task.title).where(Task.promotion == "cin1a"), timeout=1
+        )
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+        await engine.close_connection_pool()
+
+
+def test_reads_continue_during_write(database):
+    tasks = asyncio.run(read_during_write(database))
+    assert {"title": "uncommitted"} not in tasks
@@ -0,0 +1,68 @@
+import pytest
+from starlette.testclient import TestClient
+
+from app.data import DEFAULT_MATTERS
+from app.main import app
+from app.models import Matter
+
+# Long enough to be compressed.
+QUERY = {"query": "{ matters { id abbr name shortName } }"}
+
+
+@pytest.fixture(scope="module")
+def client(database):
+    if not Matter.count().run_sync():
+        Matter.insert(*DEFAULT_MATTERS).run_sync()
+    with TestClient(app) as client:
+        yield client
+
+
+def get(client, encoding="identity", if_none_match=None):
+    headers = {"Accept-Encoding": encoding}
+    if if_none_match is not None:
+        headers["If-None-Match"] = if_none_match
+    return client.get("/graphql", params=QUERY, headers=headers)
+
+
+def test_weak_etag_revalidates(client):
+    etag = get(client).headers["ETag"]
+    response = get(client, if_none_match=f'"other", W/{etag}')
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_any_etag_revalidates(client):
+    assert get(client, if_none_match="*").status_code == 304
+
+
+def test_compressed_responses_have_their_own_etag(client):
+    etag = get(client).headers["ETag"]
+    response = get(client, encoding="gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == etag[:-1] + '-gzip"'
+
+    response = get(client, encoding="gzip", if_none_match=f'W/{etag[:-1]}-gzip"')
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag[:-1] + '-gzip"'
+
+
+def test_calendar_weak_etag_revalidates(client):
+    etag = client.get("/calendar/cin1a.ics").headers["ETag"]
+    response = client.get("/calendar/cin1a.ics", headers={"If-None-Match": f"W/{etag}"})
+    assert response.status_code == 304
+
+
+def test_calendar_etag_changes_with_matters(client):
+    etag = client.get("/calendar/cin1a.ics").headers["ETag"]
+    matter = Matter.select().first().run_sync()
+    Matter.update({Matter.short_name: "Renamed"}).where(
+        Matter.id == matter["id"]
+    ).run_sync()
+    try:
+        response = client.get("/calendar/cin1a.ics", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+    finally:
+        Matter.update({Matter.short_name: matter["short_name"]}).where(
+            Matter.id == matter["id"]
+        ).run_sync()
@@ -0,0 +1,38 @@
+import re
+import sqlite3
+from datetime import date
+
+from piccolo.query import Query
+
+from app.models import Profile, Task
+
+
+def query_plan(database: str, query: Query) -> str:
+    sql, args = query.querystrings[0].compile_string(engine_type="sqlite")
+    with sqlite3.connect(database) as connection:
+        rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}", args).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_week_uses_promotion_date_index(database):
+    query = (
+        Task.select()
+        .where(
+            (Task.promotion == "cin1a")
+            & (Task.date >= date(2026, 10, 19))
+            & (Task.date <= date(2026, 10, 25))
+        )
+        .order_by(Task.date, Task.id)
+    )
+    plan = query_plan(database, query)
+    assert re.search(r"SEARCH task USING INDEX task_promotion_date \(", plan), plan
+
+
+def test_public_profiles_use_promotion_is_public_index(database):
+    query = Profile.select().where(
+        (Profile.promotion == "cin1a") & (Profile.is_public.eq(True))
+    )
+    plan = query_plan(database, query)
+    assert re.search(
+        r"SEARCH profile USING (COVERING )?INDEX profile_promotion_is_public \(", plan
+    ), plan
@@ -0,0 +1,49 @@
+from graphql import parse
+
+from app.schemas import schema
+from app.schemas.extensions import selection_set_cost
+
+UPSERT = """
+mutation ($tasks: [TaskInput!]!) {
+  upsertTasks(tasks: $tasks) { id matter { name } }
+}
+"""
+
+
+def cost(query, variables=None):
+    graphql_schema = schema._schema
+    operation = parse(query).definitions[0]
+    return selection_set_cost(
+        graphql_schema,
+        graphql_schema.mutation_type,
+        operation.selection_set,
+        {},
+        variables,
+    )
+
+
+def task(title):
+    return {
+        "date": "2026-10-19",
+        "promotion": "cin1a",
+        "type": "test",
+        "matter": "fran",
+        "title": title,
+    }
+
+
+def test_upsert_tasks_cost_scales_with_tasks():
+    assert cost(UPSERT, {"tasks": [task("a")]}) == 2
+    assert cost(UPSERT, {"tasks": [task(str(i)) for i in range(100)]}) == 200
+
+
+def test_upsert_tasks_cost_counts_literal_lists():
+    query = """
+    mutation {
+      upsertTasks(tasks: [
+        {date: "2026-10-19", promotion: "cin1a", type: "test", matter: "fran", title: "a"}
+        {date: "2026-10-20", promotion: "cin1a", type: "test", matter: "fran", title: "b"}
+      ]) { id }
+    }
+    """
+    assert cost(query) == 2